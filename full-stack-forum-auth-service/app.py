@@ -1,17 +1,30 @@
 # app.py
-from flask import Flask
+from flask import Flask, jsonify
 from dotenv import load_dotenv
 import os
 load_dotenv()
 
 
 from auth import auth_bp
+from auth.services.password_verifier import password_verifier
+from auth.services.user_service_client import invalidate_cached_user
 
 app = Flask(__name__)
 app.register_blueprint(auth_bp, url_prefix='/auth')
 
 from shared.error_handlers import register_error_handlers
+from shared.http_client import register_upstream_metrics
 register_error_handlers(app)
+register_upstream_metrics(app)
+
+# Drop cached credential records when the user service changes a user
+from shared.events import USER_EVENTS, subscribe
+subscribe(USER_EVENTS, invalidate_cached_user)
+
+# Queue depth and throughput of the password hashing pool
+@app.route('/metrics/password-hashing', methods=['GET'])
+def password_hashing_metrics():
+    return jsonify(password_verifier.stats()), 200
 
 if __name__ == '__main__':
     port = int(os.getenv("PORT", 5006))
@@ -2,15 +2,17 @@
 import os
 import datetime
 import jwt
+import redis
 from flask import jsonify, request
-from werkzeug.security import check_password_hash  # Use this instead of bcrypt.checkpw
+from auth.services.password_verifier import password_verifier, rehash_if_needed
 from auth.services.user_service_client import get_user_by_email
 from auth.utils.jwt_utils import generate_jwt, decode_jwt
 from dotenv import load_dotenv
 
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
-from shared.exceptions import ServerError
+from shared.exceptions import ServerError, ServiceUnavailableError
+from shared.revocation import revoke_token
 
 load_dotenv()  # Ensure environment variables are loaded
 
@@ -25,7 +27,7 @@ def login_user(request_obj):
 
         # get user information
         user = get_user_by_email(email)
-        print(f"Retrieved user data: {user}")  # Debug user data
+        print(f"Retrieved user data for {email}: {'found' if user else 'not found'}")  # never log the password hash
 
         if not user:
             return jsonify({'error': 'Invalid credentials'}), 401
@@ -41,9 +43,11 @@ def login_user(request_obj):
             print(f"Login blocked: Banned user -> {email}")
             return jsonify({'error': 'Your account has been banned. Please contact support.'}), 403
 
-        # validate password
-        if not check_password_hash(user.get('hashedPassword', ''), password):
+        # validate password in the hashing pool (503 when it is saturated)
+        hashed_password = user.get('hashedPassword', '')
+        if not password_verifier.check(hashed_password, password):
             return jsonify({'error': 'Invalid credentials'}), 401
+        rehash_if_needed(user.get('id'), hashed_password, password)
 
         # generate jwt token
         user_payload = {
@@ -70,6 +74,8 @@ def login_user(request_obj):
             }
         }), 200
 
+    except ServiceUnavailableError:
+        raise
     except Exception as e:
         print(f"Server error during login: {str(e)}")
         raise ServerError("Internal Server Error", status_code=500)
@@ -93,9 +99,60 @@ def verify_token(request_obj):
     except jwt.InvalidTokenError:
         return jsonify({'error': 'Invalid token.'}), 401
 
+MAX_VERIFY_BATCH = 100
+
+def verify_tokens(request_obj):
+    """
+    Verifies many tokens in one call, e.g. for the gateway or another service.
+    Expects {"tokens": [...]} and returns one result per token, in order.
+    """
+    data = request_obj.get_json(silent=True)
+    tokens = data.get('tokens') if data else None
+    if not isinstance(tokens, list) or not tokens:
+        return jsonify({'error': "A non-empty 'tokens' list is required."}), 400
+    if len(tokens) > MAX_VERIFY_BATCH:
+        return jsonify({'error': f'At most {MAX_VERIFY_BATCH} tokens per request.'}), 400
+
+    results = []
+    for token in tokens:
+        if not isinstance(token, str):
+            results.append({'valid': False, 'error': 'Invalid token.'})
+            continue
+        try:
+            results.append({'valid': True, 'decoded': decode_jwt(token)})
+        except jwt.ExpiredSignatureError:
+            results.append({'valid': False, 'error': 'Token has expired.'})
+        except jwt.InvalidTokenError:
+            results.append({'valid': False, 'error': 'Invalid token.'})
+    return jsonify({'results': results}), 200
+
 def logout_user(request_obj):
     """
-    Simulate logout by returning a success message.
-    In a real system, you might implement token blacklisting.
+    Revokes the access token sent in the Authorization header until it expires.
+    Every service rejects it once its revocation mirror has refreshed (REVOCATION_REFRESH_INTERVAL).
     """
-    return jsonify({'message': 'Logout successful. Please discard your token.'}), 200
+    auth_header = request_obj.headers.get('Authorization')
+    if not auth_header or not auth_header.startswith('Bearer '):
+        return jsonify({'error': 'Missing or invalid Authorization header.'}), 401
+
+    try:
+        payload = decode_jwt(auth_header.split(' ')[1])
+    except jwt.ExpiredSignatureError:
+        # Nothing left to revoke
+        return jsonify({'message': 'Logout successful.'}), 200
+    except jwt.InvalidTokenError:
+        return jsonify({'error': 'Invalid token.'}), 401
+
+    jti = payload.get('jti')
+    if not jti:
+        # Issued before tokens carried a jti, it cannot be revoked and simply runs out
+        return jsonify({'message': 'Logout successful. Please discard your token.'}), 200
+
+    try:
+        revoke_token(jti, payload['exp'])
+    except redis.exceptions.RedisError as e:
+        print(f"❌ [Auth] Could not revoke token {jti}: {e}")
+        raise ServiceUnavailableError("Logout is temporarily unavailable, please retry")
+
+    print(f"Logout: revoked token {jti} of user {payload.get('user_id')}")
+    return jsonify({'message': 'Logout successful.'}), 200
@@ -1,7 +1,7 @@
 # auth/routes.py
 from flask import request, jsonify
 from auth import auth_bp
-from auth.controllers.auth_controller import login_user, logout_user
+from auth.controllers.auth_controller import login_user, logout_user, verify_token, verify_tokens
 
 @auth_bp.route('/login', methods=['POST'])
 def login():
@@ -17,12 +17,19 @@ def login():
 #     print("[Auth Routes] /refresh endpoint returning response:", response)
 #     return response
 
-# @auth_bp.route('/verify', methods=['GET'])
-# def verify():
-#     print("[Auth Routes] /verify endpoint called")
-#     response = verify_token(request)
-#     print("[Auth Routes] /verify endpoint returning response:", response)
-#     return response
+@auth_bp.route('/verify', methods=['GET'])
+def verify():
+    print("[Auth Routes] /verify endpoint called")
+    response = verify_token(request)
+    print("[Auth Routes] /verify endpoint returning response:", response)
+    return response
+
+@auth_bp.route('/verify', methods=['POST'])
+def verify_batch():
+    print("[Auth Routes] /verify (batch) endpoint called")
+    response = verify_tokens(request)
+    print("[Auth Routes] /verify (batch) endpoint returning response:", response)
+    return response
 
 @auth_bp.route('/logout', methods=['POST'])
 def logout():
@@ -0,0 +1,117 @@
+# auth/services/password_verifier.py
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from werkzeug.security import check_password_hash
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+from shared.discovery import internal_headers, service_url
+from shared.exceptions import ServiceUnavailableError
+from shared.http_client import http
+from shared.passwords import needs_rehash
+
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", str(PASSWORD_WORKERS * 4)))
+PASSWORD_TIMEOUT = float(os.getenv("PASSWORD_TIMEOUT", "10"))
+
+class PasswordVerifier:
+    """
+    Runs password hashing in a process pool sized to the cores, so PBKDF2 work does not hold the
+    GIL of the Flask worker. At most `max_pending` hashes may be queued or running; beyond that
+    callers get a 503 instead of piling up behind the pool.
+    """
+    def __init__(self, workers=PASSWORD_WORKERS, max_pending=PASSWORD_MAX_PENDING, timeout=PASSWORD_TIMEOUT):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._stats_lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._total_ms = 0.0
+
+    def _pool(self):
+        # Created on first use, so the pool is not forked by the debug reloader parent
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self._rejected += 1
+            raise ServiceUnavailableError("Too many logins in progress, please retry shortly")
+
+        start = time.perf_counter()
+        with self._stats_lock:
+            self._pending += 1
+        try:
+            future = self._pool().submit(fn, *args)
+        except BaseException:
+            self._finished()
+            raise
+        # A timed out hash keeps running in the pool, so its slot is only freed once it is done
+        future.add_done_callback(lambda _: self._finished())
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            with self._stats_lock:
+                self._timed_out += 1
+            raise ServiceUnavailableError("Password verification timed out, please retry")
+        with self._stats_lock:
+            self._completed += 1
+            self._total_ms += (time.perf_counter() - start) * 1000
+        return result
+
+    def _finished(self):
+        with self._stats_lock:
+            self._pending -= 1
+        self._slots.release()
+
+    def check(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "workers": self.workers,
+                "maxPending": self.max_pending,
+                "pending": self._pending,
+                "queueDepth": max(0, self._pending - self.workers),
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "timedOut": self._timed_out,
+                "avgLatencyMs": round(self._total_ms / self._completed, 2) if self._completed else 0.0
+            }
+
+password_verifier = PasswordVerifier()
+
+# Rehashing happens after the login response is built, one at a time, off the request thread
+_rehash_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="password-rehash")
+
+def _rehash(user_id, password):
+    # The user service checks the password against the stored hash before hashing it again, it never
+    # accepts a hash from the caller
+    try:
+        response = http.put(f"{service_url('user')}/users/{user_id}/password-hash",
+                            json={"password": password},
+                            headers=internal_headers(forward_identity=False))
+        if response.status_code != 200:
+            print(f"❌ [Auth] Rehash for user {user_id} rejected: {response.status_code}")
+    except Exception as e:
+        # Best effort, the next login tries again
+        print(f"❌ [Auth] Rehash for user {user_id} failed: {e}")
+
+def rehash_if_needed(user_id, pwhash, password):
+    """Upgrade a verified password's hash in the background when PASSWORD_HASH_METHOD has changed."""
+    if needs_rehash(pwhash):
+        _rehash_executor.submit(_rehash, user_id, password)
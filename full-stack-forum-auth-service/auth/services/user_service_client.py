@@ -1,28 +1,58 @@
 # auth/services/user_service_client.py
 import os
+import sys
 import requests
 from dotenv import load_dotenv
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+from shared.cache import TTLCache
+from shared.discovery import internal_headers, service_url
+from shared.http_client import http
+
 load_dotenv()
 
-USER_SERVICE_URL = os.getenv('USER_SERVICE_URL', 'http://localhost:5001')
+USER_SERVICE_URL = service_url("user")
+
+# Credential records by email, so login storms don't each cost a user service call and a MySQL read.
+# Kept short-lived, and dropped on user service events (status, verification, email, role changes).
+user_cache = TTLCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", "10000")),
+    ttl=int(os.getenv("USER_CACHE_TTL", "30"))
+)
+
+def _cache_key(email):
+    return email.strip().lower()
+
+def invalidate_cached_user(event):
+    """
+    Handler for user service events. Events carry the user's email, and previousEmail when it changed.
+    """
+    for email in (event.get("email"), event.get("previousEmail")):
+        if email:
+            user_cache.delete(_cache_key(email))
 
 def get_user_by_email(email):
     """
     Sends a GET request to the User Service's search endpoint to fetch user data by email.
+    Successful lookups are served from user_cache until they expire or the user changes.
     """
+    cached_user = user_cache.get(_cache_key(email))
+    if cached_user is not None:
+        return cached_user
+
     try:
         url = f"{USER_SERVICE_URL}/users/search"
-        print(f"🚀 [Auth] Sending request to User Service: {url} with email: {email}")
+        print(f"🚀 [Auth] Sending request to User Service: {url}")
 
-        # Add timeout to detect if the request is hanging
-        response = requests.get(url, params={"email": email}, timeout=5)
+        # Pooled client: keep-alive, default timeouts and retries with backoff
+        response = http.get(url, params={"email": email}, headers=internal_headers(forward_identity=False))
 
         print(f"🔄 [Auth] User Service Response - Status: {response.status_code}")
-        print(f"🔄 [Auth] User Service Response - Body: {response.text}")
 
         if response.status_code == 200:
-            return response.json()
+            user = response.json()
+            user_cache.set(_cache_key(email), user)
+            return user
         else:
             print(f"❌ [Auth] User Service returned error code {response.status_code}")
             return None
@@ -1,14 +1,116 @@
 # auth/utils/jwt_utils.py
 import os
+import sys
 import jwt
+import json
+import time
+import uuid
+import hashlib
 import datetime
+import threading
+from jwt.algorithms import get_default_algorithms
 from dotenv import load_dotenv
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+from shared.cache import TTLCache
+from shared.revocation import is_token_revoked
+
 load_dotenv()
 JWT_SECRET = os.getenv('JWT_SECRET', 'YourSuperSecretKey')
 JWT_ALGORITHM = os.getenv('JWT_ALGORITHM', 'HS256')
 JWT_EXPIRES_IN = int(os.getenv('JWT_EXPIRES_IN', '3600'))  # seconds
 REFRESH_TOKEN_EXPIRES_IN = int(os.getenv('REFRESH_TOKEN_EXPIRES_IN', '86400'))  # e.g., 24 hours
+JWT_KEYS_FILE = os.getenv('JWT_KEYS_FILE')  # optional keyset, see KeySet
+JWT_KEYS_RELOAD_INTERVAL = float(os.getenv('JWT_KEYS_RELOAD_INTERVAL', '10'))  # seconds between mtime checks
+JWT_CACHE_SIZE = int(os.getenv('JWT_CACHE_SIZE', '10000'))
+DEFAULT_KID = 'default'
+
+class SigningKey:
+    """One keyset entry, with its key material parsed once up front instead of on every decode."""
+    def __init__(self, kid, algorithm, signing_material, verifying_material):
+        self.kid = kid
+        self.algorithm = algorithm
+        algorithm_impl = get_default_algorithms()[algorithm]
+        self.signing_key = algorithm_impl.prepare_key(signing_material) if signing_material else None
+        self.verifying_key = algorithm_impl.prepare_key(verifying_material)
+
+def _load_key(kid, entry):
+    algorithm = entry.get('algorithm', JWT_ALGORITHM)
+    if algorithm.startswith('HS'):
+        return SigningKey(kid, algorithm, entry['secret'], entry['secret'])
+    # Asymmetric keys: the private key is optional, so verify-only keys can be kept for rotation
+    return SigningKey(kid, algorithm, entry.get('privateKey'), entry['publicKey'])
+
+class KeySet:
+    """
+    Signing and verification keys by `kid`. Without JWT_KEYS_FILE there is a single key, JWT_SECRET,
+    under the "default" kid. With it, the file looks like
+        {"active": "2025-06", "keys": {"2025-06": {"algorithm": "HS256", "secret": "..."},
+                                       "2025-01": {"algorithm": "RS256", "publicKey": "-----BEGIN ..."}}}
+    and is re-read when its mtime changes, so keys can be rotated without a restart.
+    Tokens without a kid header (issued before keysets) are checked against the "default" kid,
+    so keep a "default" entry in the file until those tokens have expired.
+    """
+    def __init__(self, path=None, reload_interval=JWT_KEYS_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._checked_at = 0.0
+        self._listeners = []
+        # (keys by kid, active kid), swapped as one object on reload
+        self._state = ({DEFAULT_KID: _load_key(DEFAULT_KID, {'algorithm': JWT_ALGORITHM, 'secret': JWT_SECRET})}, DEFAULT_KID)
+        self._maybe_reload(force=True)
+
+    def on_reload(self, listener):
+        self._listeners.append(listener)
+
+    def _maybe_reload(self, force=False):
+        if not self.path:
+            return
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+                if mtime == self._mtime:
+                    return
+                with open(self.path) as f:
+                    config = json.load(f)
+                keys = {kid: _load_key(kid, entry) for kid, entry in config['keys'].items()}
+                active = config.get('active', next(iter(keys)))
+                if keys[active].signing_key is None:
+                    raise ValueError(f"active key {active} has no signing material")
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"❌ [Auth] Keeping current JWT keys, could not load {self.path}: {e}")
+                return
+            self._state, self._mtime = (keys, active), mtime
+            print(f"🔑 [Auth] Loaded {len(keys)} JWT keys, active kid: {active}")
+        for listener in self._listeners:
+            listener()
+
+    def refresh(self):
+        """Pick up a changed keyset file, checked at most every reload_interval seconds."""
+        self._maybe_reload()
+
+    def active(self):
+        keys, active = self._state
+        return keys[active]
+
+    def get(self, kid):
+        return self._state[0].get(kid)
+
+keyset = KeySet(JWT_KEYS_FILE)
+
+# Payloads of tokens that verified, by SHA-256 of the token, each kept until the token's exp
+_verified_tokens = TTLCache(maxsize=JWT_CACHE_SIZE, ttl=JWT_EXPIRES_IN)
+# Keys may have been removed, so earlier verifications can no longer be trusted
+keyset.on_reload(_verified_tokens.clear)
+
+def token_digest(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
 
 def generate_jwt(user):
     payload = {
@@ -17,18 +119,44 @@ def generate_jwt(user):
         'email': user.get('email'),
         'verified': user.get('verified'),
         'active': user.get('active'),
+        'jti': uuid.uuid4().hex,
         'iat': datetime.datetime.now(datetime.timezone.utc),
         'exp': datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=JWT_EXPIRES_IN)
     }
-    token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    keyset.refresh()
+    key = keyset.active()
+    token = jwt.encode(payload, key.signing_key, algorithm=key.algorithm, headers={'kid': key.kid})
     if isinstance(token, bytes):
         token = token.decode('utf-8')
     return token
 
+def _verify(token, digest):
+    """Checks the signature and expiry against the key named by the kid header and caches the payload."""
+    kid = jwt.get_unverified_header(token).get('kid', DEFAULT_KID)
+    # The header is untrusted: a list or object kid would make the keyset lookup raise TypeError
+    if not isinstance(kid, str):
+        raise jwt.InvalidTokenError("Invalid key id")
+    key = keyset.get(kid)
+    if key is None:
+        raise jwt.InvalidTokenError(f"Unknown key id: {kid}")
+
+    payload = jwt.decode(token, key.verifying_key, algorithms=[key.algorithm])
+    remaining = payload.get('exp', 0) - time.time()
+    if remaining > 0:
+        _verified_tokens.set(digest, payload, ttl=remaining)
+    return payload
+
 def decode_jwt(token, token_type='access'):
     """
-    Decodes a JWT token. You can extend this to differentiate between access and refresh tokens if needed.
+    Decodes and verifies a JWT token, raising jwt.ExpiredSignatureError / jwt.InvalidTokenError as PyJWT does.
+    Successful verifications are cached by token digest until the token expires; revocation is checked on every call.
     """
-    payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-    print(f"🛠 [DEBUG] Decoded JWT payload: {payload}")  # make sure decoded token contains verified
-    return payload
+    # Before the cache lookup, so a rotation clears verifications made with removed keys
+    keyset.refresh()
+    digest = token_digest(token)
+    payload = _verified_tokens.get(digest)
+    if payload is None:
+        payload = _verify(token, digest)
+    if is_token_revoked(payload.get('jti')):
+        raise jwt.InvalidTokenError("Token has been revoked")
+    return dict(payload)
@@ -1,10 +1,15 @@
 from flask import Flask
+from controllers.presign_blueprint import presign_bp
 from controllers.upload_blueprint import upload_bp
+from services import UPLOAD_MAX_REQUEST_BYTES
 
 app = Flask(__name__)
+# Per-request byte limit, enforced while the body is read (413 past it)
+app.config["MAX_CONTENT_LENGTH"] = UPLOAD_MAX_REQUEST_BYTES
 
 # Register the Blueprint
 app.register_blueprint(upload_bp, url_prefix='/files')
+app.register_blueprint(presign_bp, url_prefix='/files')
 
 if __name__ == "__main__":
     app.run(port=5008)
\ No newline at end of file
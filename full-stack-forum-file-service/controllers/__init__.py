@@ -1 +1,2 @@
-from .upload_blueprint import upload_bp
\ No newline at end of file
+from .presign_blueprint import presign_bp
+from .upload_blueprint import upload_bp
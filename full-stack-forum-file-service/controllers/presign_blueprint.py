@@ -0,0 +1,170 @@
+import base64
+import os
+import re
+import sys
+from flask import Blueprint, request, jsonify
+from botocore.exceptions import ClientError
+from services import (S3_BUCKET, UPLOAD_MAX_REQUEST_BYTES, file_id_of, file_index, file_metadata, file_url,
+                      image_jobs, new_file_key, release_file, s3_client, upload_executor)
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from shared.auth import authenticate_user
+
+PRESIGN_EXPIRES_IN = int(os.getenv("PRESIGN_EXPIRES_IN", "900"))  # seconds
+PRESIGN_MAX_FILE_BYTES = int(os.getenv("PRESIGN_MAX_FILE_BYTES", str(UPLOAD_MAX_REQUEST_BYTES)))
+MAX_PRESIGN_FILES = 20
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+presign_bp = Blueprint("presign", __name__)
+
+def user_prefix(user_id):
+    # Keys carry their owner, so only the uploader can attach them to a post
+    return f"uploads/u{user_id}"
+
+# Issue presigned URLs so clients upload straight to S3
+@presign_bp.route("/presign", methods=["POST"])
+@authenticate_user()
+def presign_uploads(user_id, user_role, user_verified):
+    """
+    Takes {"files": [{"filename", "contentType", "size", "sha256"}], "method": "POST" | "PUT"} and returns
+    one upload target per file. POST targets are a form upload whose policy enforces the content type and
+    PRESIGN_MAX_FILE_BYTES; PUT targets sign the declared size and type, and the SHA-256 checksum when
+    one is given so S3 rejects a body that does not match it. Files whose hex "sha256" the caller already
+    stored come back as {"duplicate": true, "key"} without a target and need no upload. Content stored by
+    other users is never shortcut here: a claimed hash proves nothing, so the client uploads and /complete
+    deduplicates once S3 has verified the body. Either way, the keys are handed to POST /files/complete
+    (or to the post service, which calls it).
+    """
+    data = request.get_json(silent=True) or {}
+    files = data.get("files")
+    method = data.get("method", "POST").upper()
+    if not isinstance(files, list) or not files:
+        return jsonify({"error": "Invalid request, 'files' list required"}), 400
+    if len(files) > MAX_PRESIGN_FILES:
+        return jsonify({"error": f"At most {MAX_PRESIGN_FILES} files per request"}), 400
+    if method not in ("POST", "PUT"):
+        return jsonify({"error": "Invalid method, POST or PUT required"}), 400
+
+    uploads = []
+    for file in files:
+        filename = file.get("filename") if isinstance(file, dict) else None
+        if not filename:
+            return jsonify({"error": "Invalid request, every file needs a filename"}), 400
+        content_type = file.get("contentType") or "application/octet-stream"
+        size = file.get("size")
+        if not isinstance(size, int) or not 0 < size <= PRESIGN_MAX_FILE_BYTES:
+            return jsonify({"error": f"Invalid size for {filename}, 1 to {PRESIGN_MAX_FILE_BYTES} bytes required"}), 400
+
+        sha256 = file.get("sha256")
+        if sha256 is not None and not (isinstance(sha256, str) and SHA256_RE.match(sha256)):
+            return jsonify({"error": f"Invalid sha256 for {filename}, 64 lowercase hex digits required"}), 400
+
+        existing = file_index.lookup(sha256) if sha256 else None
+        if existing and existing["key"].startswith(user_prefix(user_id) + "/"):
+            uploads.append({"file_id": file_id_of(existing["key"]), "key": existing["key"], "filename": filename,
+                            "duplicate": True})
+            continue
+
+        file_id, file_key = new_file_key(filename, prefix=user_prefix(user_id))
+        if method == "POST":
+            target = s3_client.generate_presigned_post(
+                S3_BUCKET, file_key,
+                Fields={"Content-Type": content_type},
+                Conditions=[{"Content-Type": content_type}, ["content-length-range", 1, PRESIGN_MAX_FILE_BYTES]],
+                ExpiresIn=PRESIGN_EXPIRES_IN
+            )
+            upload = {"method": "POST", "url": target["url"], "fields": target["fields"]}
+        else:
+            params = {"Bucket": S3_BUCKET, "Key": file_key, "ContentType": content_type, "ContentLength": size}
+            headers = {"Content-Type": content_type}
+            if sha256:
+                # S3 verifies the body against this and keeps it, so /complete can index the object
+                checksum = base64.b64encode(bytes.fromhex(sha256)).decode("ascii")
+                params["ChecksumSHA256"] = checksum
+                headers["x-amz-checksum-sha256"] = checksum
+            url = s3_client.generate_presigned_url("put_object", Params=params, ExpiresIn=PRESIGN_EXPIRES_IN)
+            upload = {"method": "PUT", "url": url, "headers": headers}
+        uploads.append({"file_id": file_id, "key": file_key, "filename": filename, **upload})
+
+    return jsonify({"uploads": uploads, "expiresIn": PRESIGN_EXPIRES_IN}), 200
+
+def _head(file_key):
+    try:
+        return s3_client.head_object(Bucket=S3_BUCKET, Key=file_key, ChecksumMode="ENABLED")
+    except ClientError as e:
+        if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+
+# Completion callback for presigned uploads
+@presign_bp.route("/complete", methods=["POST"])
+@authenticate_user()
+def complete_uploads(user_id, user_role, user_verified):
+    """
+    Takes {"keys": [...]} of presigned uploads, checks that each belongs to the caller and is in S3,
+    and returns their URLs and sizes. Fails as a whole if any key is rejected.
+
+    Every completed key is one reference in the file index, released by DELETE /files/upload/<key>.
+    Uploads carrying an S3-verified SHA-256 are indexed here; when identical content was stored first,
+    the new object is dropped and the existing key returned in its place. Only the caller's own keys
+    are accepted, duplicates handed out by /presign included.
+    """
+    data = request.get_json(silent=True) or {}
+    keys = data.get("keys")
+    if not isinstance(keys, list) or not keys or not all(isinstance(key, str) for key in keys):
+        return jsonify({"error": "Invalid request, 'keys' list required"}), 400
+    if len(keys) > MAX_PRESIGN_FILES:
+        return jsonify({"error": f"At most {MAX_PRESIGN_FILES} keys per request"}), 400
+
+    prefix = user_prefix(user_id) + "/"
+    rejected = [key for key in keys if not key.startswith(prefix) or ".." in key]
+    if rejected:
+        return jsonify({"error": "Forbidden: keys were not issued to you", "keys": rejected}), 403
+    # Already indexed: a duplicate handed out by /presign, or a key completed before
+    indexed = [key for key in keys if file_index.lookup_key(key)]
+
+    # HEAD all keys concurrently
+    try:
+        heads = list(upload_executor.map(_head, keys))
+    except ClientError as e:
+        return jsonify({"error": f"Error checking uploads: {e.response['Error']['Message']}"}), 502
+
+    missing = [key for key, head in zip(keys, heads) if head is None]
+    if missing:
+        return jsonify({"error": "Uploads not found", "keys": missing}), 400
+
+    files = []
+    for key, head in zip(keys, heads):
+        stored_key = _reference(key, head, key in indexed)
+        if stored_key is None:
+            # Released in the meantime; give back the references taken so far
+            for file in files:
+                release_file(file["key"])
+            return jsonify({"error": "Uploads not found", "keys": [key]}), 400
+        files.append({
+            "file_id": file_id_of(stored_key),
+            "key": stored_key,
+            "file_url": file_url(stored_key),
+            "size": head["ContentLength"],
+            "contentType": head.get("ContentType")
+        })
+    for file in files:
+        image_jobs.publish(S3_BUCKET, file["key"], file["file_url"], file["contentType"])
+    return jsonify({"files": files}), 200
+
+def _reference(key, head, indexed):
+    """Take the completion's reference on `key` and return the key holding its content (None if it is gone)."""
+    if indexed:
+        return key if file_index.reference_key(key) else None
+    checksum = head.get("ChecksumSHA256")
+    # Multipart uploads carry a checksum of part checksums ("<base64>-<parts>"), not of the content
+    if not checksum or "-" in checksum:
+        file_metadata.record(key, head["ContentLength"], head.get("ContentType"))
+        return key
+    sha256 = base64.b64decode(checksum).hex()
+    stored_key = file_index.register(sha256, key, head["ContentLength"], head.get("ContentType"))
+    if stored_key != key:
+        s3_client.delete_object(Bucket=S3_BUCKET, Key=key)
+    else:
+        file_metadata.record(key, head["ContentLength"], head.get("ContentType"), sha256=sha256)
+    return stored_key
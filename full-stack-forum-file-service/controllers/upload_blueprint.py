@@ -1,27 +1,18 @@
-import boto3
-import uuid
-import os
+import redis
 from flask import Blueprint, request, jsonify
-from dotenv import load_dotenv
 from botocore.exceptions import ClientError
+from werkzeug.exceptions import RequestEntityTooLarge
+from services import (S3_BUCKET, UPLOAD_MAX_REQUEST_BYTES, UploadSession, UploadTooLarge, describe_file, file_id_of,
+                      file_index, file_metadata, file_url, image_jobs, new_file_key, release_file, s3_client,
+                      store_file, stream_multipart_upload, upload_executor)
 
-# Load environment variables
-load_dotenv()
-
-# AWS S3 Configuration
-S3_BUCKET = "forum-platform-post-service-bucket"
-S3_REGION = "us-east-2"
-S3_ACCESS_KEY = os.getenv("AWS_ACCESS_KEY")
-S3_SECRET_KEY = os.getenv("AWS_SECRET_KEY")
+upload_bp = Blueprint("upload", __name__)
 
-s3_client = boto3.client(
-    "s3",
-    region_name=S3_REGION,
-    aws_access_key_id=S3_ACCESS_KEY,
-    aws_secret_access_key=S3_SECRET_KEY
-)
+MAX_METADATA_KEYS = 100
 
-upload_bp = Blueprint("upload", __name__)
+def client_error_status(e):
+    # S3's HTTP status (404, 403, ...) rather than its string error code
+    return e.response.get("ResponseMetadata", {}).get("HTTPStatusCode") or 502
 
 # Upload Files to S3
 @upload_bp.route("/upload", methods=["POST"])
@@ -33,38 +24,121 @@ def upload_files():
     if not files:
         return jsonify({"error": "No files provided"}), 400
 
-    uploaded_files = []
-
+    # Upload all files concurrently in the shared upload pool, content already stored is only referenced
+    uploads = []
     for file in files:
-        file_extension = file.filename.split('.')[-1]
-        file_id = str(uuid.uuid4())
-        file_key = f"uploads/{file_id}.{file_extension}"
+        _, file_key = new_file_key(file.filename)
+        uploads.append((file, upload_executor.submit(store_file, file, file_key)))
 
+    # Every upload is waited for, so none is still running (and left unreferenced) if another failed
+    stored = []
+    failure = None
+    for file, future in uploads:
         try:
-            s3_client.upload_fileobj(file, S3_BUCKET, file_key)
-            file_url = f"https://{S3_BUCKET}.s3.{S3_REGION}.amazonaws.com/{file_key}"
-
-            uploaded_files.append({"file_id": file_id, "file_url": file_url})
+            stored.append((file, future.result()))
         except Exception as e:
-            return jsonify({"error": f"Upload failed for {file.filename}: {str(e)}"}), 500
+            failure = failure or (file, e)
+
+    if failure:
+        # The request fails as a whole, so the references taken by the files that did upload are dropped
+        for file, file_key in stored:
+            try:
+                release_file(file_key)
+            except Exception as e:
+                print(f"❌ Could not release {file_key} after a failed upload: {e}")
+        file, e = failure
+        return jsonify({"error": f"Upload failed for {file.filename}: {str(e)}"}), 500
+
+    uploaded_files = []
+    for file, file_key in stored:
+        uploaded_files.append({"file_id": file_id_of(file_key), "file_url": file_url(file_key)})
+        # Resized and WebP variants of images are built by the image worker
+        image_jobs.publish(S3_BUCKET, file_key, file_url(file_key), file.mimetype)
 
     return jsonify({"message": "Files uploaded successfully", "files": uploaded_files}), 201
 
+# Upload Files to S3 straight from the request body
+@upload_bp.route("/upload/stream", methods=["POST"])
+def upload_files_streaming():
+    """
+    Same request and response as POST /upload, but each "file" part is piped into an S3 multipart
+    upload while the body is still arriving, instead of being spooled by Werkzeug first. Memory per
+    request is bounded by the part size and in-flight part limit, and bodies over
+    UPLOAD_MAX_REQUEST_BYTES are rejected with 413.
+    """
+    boundary = request.mimetype_params.get("boundary")
+    if request.mimetype != "multipart/form-data" or not boundary:
+        return jsonify({"error": "multipart/form-data body required"}), 400
+    if request.content_length is not None and request.content_length > UPLOAD_MAX_REQUEST_BYTES:
+        return jsonify({"error": f"Upload exceeds {UPLOAD_MAX_REQUEST_BYTES} bytes"}), 413
+
+    def key_for(filename):
+        return new_file_key(filename)[1]
+
+    session = UploadSession(s3_client, S3_BUCKET, index=file_index)
+    try:
+        stored = stream_multipart_upload(request.stream, boundary, session, key_for)
+    except (UploadTooLarge, RequestEntityTooLarge):
+        session.abort()
+        return jsonify({"error": f"Upload exceeds {UPLOAD_MAX_REQUEST_BYTES} bytes"}), 413
+    except ValueError as e:
+        session.abort()
+        return jsonify({"error": f"Invalid multipart body: {str(e)}"}), 400
+    except Exception as e:
+        session.abort()
+        return jsonify({"error": f"Upload failed: {str(e)}"}), 500
+
+    if not stored:
+        return jsonify({"error": "No files provided"}), 400
+
+    uploaded_files = []
+    for filename, writer in stored:
+        uploaded_files.append({"file_id": file_id_of(writer.key), "file_url": file_url(writer.key), "size": writer.size})
+        if not writer.deduplicated:
+            file_metadata.record(writer.key, writer.size, writer.content_type, sha256=writer.sha256)
+        image_jobs.publish(S3_BUCKET, writer.key, file_url(writer.key), writer.content_type)
+    return jsonify({"message": "Files uploaded successfully", "files": uploaded_files}), 201
+
 
 # Retrieve File Metadata by ID
 @upload_bp.route("/upload/<path:file_id>", methods=["GET"])
 def get_file_metadata(file_id):
     try:
-        metadata = s3_client.head_object(Bucket=S3_BUCKET, Key=file_id)
-        return jsonify({"file_id": file_id, "metadata": metadata}), 200
+        metadata = file_metadata.get(file_id)
     except ClientError as e:
-        error_code = e.response["Error"]["Code"]
-        error_message = e.response["Error"]["Message"]
-        
-        return jsonify({"error": f"Error retrieving file: {error_message}"}), error_code
-    
+        return jsonify({"error": f"Error retrieving file: {e.response['Error']['Message']}"}), client_error_status(e)
     except Exception as e:
-        return jsonify({"error": f"Delete failed: {str(e)}"}), 500
+        return jsonify({"error": f"Metadata lookup failed: {str(e)}"}), 500
+
+    if metadata is None:
+        return jsonify({"error": "File not found"}), 404
+    return jsonify({"file": describe_file(file_id, metadata)}), 200
+
+# Retrieve the metadata of many files at once
+@upload_bp.route("/metadata", methods=["POST"])
+def get_files_metadata():
+    """
+    Takes {"keys": [...]} and returns {"files": {key: metadata}, "missing": [...]}, resolved from the
+    metadata cache and store with S3 only asked about keys neither knows.
+    """
+    data = request.get_json(silent=True) or {}
+    keys = data.get("keys")
+    if not isinstance(keys, list) or not keys or not all(isinstance(key, str) and key for key in keys):
+        return jsonify({"error": "Invalid request, non-empty 'keys' list required"}), 400
+    if len(keys) > MAX_METADATA_KEYS:
+        return jsonify({"error": f"Too many keys, at most {MAX_METADATA_KEYS} per request"}), 400
+
+    try:
+        found = file_metadata.get_many(keys)
+    except ClientError as e:
+        return jsonify({"error": f"Error retrieving files: {e.response['Error']['Message']}"}), 502
+    except Exception as e:
+        return jsonify({"error": f"Metadata lookup failed: {str(e)}"}), 500
+
+    return jsonify({
+        "files": {key: describe_file(key, metadata) for key, metadata in found.items()},
+        "missing": [key for key in dict.fromkeys(keys) if key not in found]
+    }), 200
     
 # Delete File from S3  
 @upload_bp.route("/upload/<path:file_id>", methods=["DELETE"])
@@ -72,14 +146,15 @@ def delete_file(file_id):
     try:
         # Check if the file exists using head_object
         s3_client.head_object(Bucket=S3_BUCKET, Key=file_id)
-        # Proceed to delete if file exists
-        s3_client.delete_object(Bucket=S3_BUCKET, Key=file_id)
-        return jsonify({"message": "File deleted successfully"}), 200
+        # Deduplicated content is shared, only the last reference deletes the object
+        if release_file(file_id):
+            return jsonify({"message": "File deleted successfully"}), 200
+        return jsonify({"message": "File reference removed"}), 200
+    except redis.exceptions.RedisError as e:
+        # Without the index there is no telling whether other uploads still use the object
+        return jsonify({"error": f"File index unavailable: {str(e)}"}), 503
     except ClientError as e:
-        error_code = e.response["Error"]["Code"]
-        error_message = e.response["Error"]["Message"]
-
-        return jsonify({"error": f"Error deleting file: {error_message}"}), error_code
+        return jsonify({"error": f"Error deleting file: {e.response['Error']['Message']}"}), client_error_status(e)
     
     except Exception as e:
         return jsonify({"error": f"Delete failed: {str(e)}"}), 500
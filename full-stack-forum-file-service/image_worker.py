@@ -0,0 +1,126 @@
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import pika
+import redis
+from services.derivatives import render_derivatives
+from services.image_jobs import RABBITMQ_HOST
+from services.storage import S3_BUCKET, file_metadata
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from shared.derivatives import IMAGE_QUEUE, record_srcsets, srcsets_for
+
+# One resizing process per core by default
+IMAGE_WORKER_PROCESSES = int(os.getenv("IMAGE_WORKER_PROCESSES", str(os.cpu_count() or 1)))
+# Jobs taken off the queue together; a batch is processed once full or IMAGE_BATCH_WAIT after its first job
+IMAGE_BATCH_SIZE = int(os.getenv("IMAGE_BATCH_SIZE", str(4 * IMAGE_WORKER_PROCESSES)))
+IMAGE_BATCH_WAIT = float(os.getenv("IMAGE_BATCH_WAIT", "0.5"))  # seconds
+
+def new_pool():
+    # spawn, not fork: each process builds its own S3 client instead of sharing the parent's connections
+    return ProcessPoolExecutor(max_workers=IMAGE_WORKER_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+
+def process_batch(connection, channel, pool, batch):
+    """
+    Render a batch of deliveries across the pool, then record their srcsets (and the dimensions of the
+    file service's own objects) in one pipeline each and ack them.
+    Returns False if the pool broke (a child died, e.g. killed for memory) and must be replaced.
+    """
+    jobs = []
+    for delivery, body in batch:
+        try:
+            job = json.loads(body)
+            jobs.append((delivery, job["bucket"], job["key"], job["url"]))
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"❌ Dropping malformed image job {body!r}: {e}")
+            channel.basic_nack(delivery.delivery_tag, requeue=False)
+
+    # Content deduplicated onto an already processed object needs no work
+    done = srcsets_for(url for _, _, _, url in jobs)
+    for delivery, _, _, url in jobs:
+        if url in done:
+            channel.basic_ack(delivery.delivery_tag)
+    jobs = [job for job in jobs if job[3] not in done]
+
+    try:
+        futures = [pool.submit(render_derivatives, bucket, key, url) for _, bucket, key, url in jobs]
+    except BrokenProcessPool:
+        # Nothing of this batch ran
+        for delivery, _, _, _ in jobs:
+            channel.basic_nack(delivery.delivery_tag, requeue=True)
+        return False
+    # Keep the connection's heartbeats going while the pool works
+    while not all(future.done() for future in futures):
+        connection.sleep(0.1)
+
+    rendered, dimensions, succeeded = {}, {}, []
+    broken = False
+    for (delivery, bucket, key, url), future in zip(jobs, futures):
+        error = future.exception()
+        if isinstance(error, BrokenProcessPool):
+            # Every job still in the pool fails with it, not only the one that killed the child.
+            # Retry once on the new pool; an image that kills it again is given up
+            broken = True
+            print(f"❌ Image worker process died while building variants of {bucket}/{key}")
+            channel.basic_nack(delivery.delivery_tag, requeue=not delivery.redelivered)
+        elif error is None:
+            if future.result() is not None:
+                rendered[url], size = future.result()
+                if bucket == S3_BUCKET:
+                    dimensions[key] = size
+            succeeded.append(delivery)
+        else:
+            # Retry once in case it was transient (S3 hiccup), then give up on the image
+            print(f"❌ Could not build variants of {bucket}/{key}: {error}")
+            channel.basic_nack(delivery.delivery_tag, requeue=not delivery.redelivered)
+
+    try:
+        if dimensions:
+            file_metadata.record_dimensions(dimensions)
+        if rendered:
+            record_srcsets(rendered)
+    except redis.exceptions.RedisError as e:
+        print(f"❌ Could not record {len(rendered)} srcsets, requeueing: {e}")
+        for delivery in succeeded:
+            channel.basic_nack(delivery.delivery_tag, requeue=True)
+        return not broken
+    for delivery in succeeded:
+        channel.basic_ack(delivery.delivery_tag)
+    if jobs:
+        print(f"🖼️ Built variants of {len(rendered)} of {len(jobs)} images")
+    return not broken
+
+def run():
+    connection = pika.BlockingConnection(pika.ConnectionParameters(RABBITMQ_HOST))
+    channel = connection.channel()
+    channel.queue_declare(queue=IMAGE_QUEUE, durable=True)
+    # Unacked deliveries are capped at one batch, the rest stay queued for other workers
+    channel.basic_qos(prefetch_count=IMAGE_BATCH_SIZE)
+
+    pool = new_pool()
+    print(f"🖼️ Image worker consuming {IMAGE_QUEUE} with {IMAGE_WORKER_PROCESSES} processes")
+    batch, deadline = [], None
+    try:
+        for delivery, properties, body in channel.consume(IMAGE_QUEUE, inactivity_timeout=IMAGE_BATCH_WAIT):
+            if delivery is not None:
+                batch.append((delivery, body))
+                deadline = deadline or time.monotonic() + IMAGE_BATCH_WAIT
+            if batch and (len(batch) >= IMAGE_BATCH_SIZE or delivery is None or time.monotonic() >= deadline):
+                if not process_batch(connection, channel, pool, batch):
+                    # A broken pool fails every later submit, replace it
+                    print("🔄 Image worker pool broke, starting a new one")
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = new_pool()
+                batch, deadline = [], None
+    finally:
+        # Deliveries of an unfinished batch go back to the queue with the connection
+        channel.cancel()
+        connection.close()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,10 @@
+from .file_index import file_index
+from .image_jobs import image_jobs
+from .streaming_upload import (UPLOAD_MAX_REQUEST_BYTES, UPLOAD_WORKERS, UploadSession, UploadTooLarge,
+                               stream_multipart_upload, upload_executor)
+from .storage import (S3_BUCKET, describe_file, file_id_of, file_metadata, file_url, new_file_key, release_file,
+                      s3_client, store_file)
+
+__all__ = ["file_index", "image_jobs", "UPLOAD_MAX_REQUEST_BYTES", "UPLOAD_WORKERS", "UploadSession", "UploadTooLarge",
+           "stream_multipart_upload", "upload_executor", "S3_BUCKET", "describe_file", "file_id_of", "file_metadata", "file_url", "new_file_key",
+           "release_file", "s3_client", "store_file"]
@@ -0,0 +1,69 @@
+import io
+import os
+import sys
+from PIL import Image, ImageOps
+from services.storage import s3_client
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from shared.derivatives import DERIVATIVE_WIDTHS, derivative_key, derivative_url, srcset
+
+WEBP_QUALITY = int(os.getenv("WEBP_QUALITY", "80"))
+JPEG_QUALITY = int(os.getenv("JPEG_QUALITY", "82"))
+# Largest image decoded, ~200 MB as RGBA; larger ones are served at their original size only.
+# Also Pillow's own decompression bomb limit, so it is set here rather than left to Pillow's default
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", "50000000"))
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+# Source keys are never reused (every upload, profile images included, gets a fresh key), so a variant's
+# URL always serves the same bytes and browsers and CDNs may keep it
+DERIVATIVE_CACHE_CONTROL = "public, max-age=31536000"
+
+def _has_alpha(image):
+    return image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+
+def _store(image, bucket, key, image_format, content_type, **options):
+    body = io.BytesIO()
+    image.save(body, image_format, **options)
+    s3_client.put_object(Bucket=bucket, Key=key, Body=body.getvalue(), ContentType=content_type,
+                         CacheControl=DERIVATIVE_CACHE_CONTROL)
+
+def render_derivatives(bucket, key, url):
+    """
+    Build the variants of one image: WebP at every DERIVATIVE_WIDTHS narrower than the source plus the
+    source width, and thumbnails in a format every browser decodes (JPEG, or PNG to keep transparency)
+    at the narrower widths. Returns ({"webp": srcset, "default": srcset}, (width, height)), the default
+    srcset ending with the original, or None for images that are not resized (animations, and images
+    over MAX_IMAGE_PIXELS, which are never decoded).
+
+    CPU bound; runs in the image worker's process pool.
+    """
+    source = s3_client.get_object(Bucket=bucket, Key=key)["Body"].read()
+    with Image.open(io.BytesIO(source)) as opened:
+        # Only the header is read so far
+        if getattr(opened, "is_animated", False) or opened.width * opened.height > MAX_IMAGE_PIXELS:
+            return None
+        # Apply the camera's orientation, variants carry no EXIF
+        image = ImageOps.exif_transpose(opened)
+        alpha = _has_alpha(image)
+        image = image.convert("RGBA" if alpha else "RGB")
+
+    width, height = image.size
+    widths = [target for target in DERIVATIVE_WIDTHS if target < width]
+    webp, default = [], []
+    for target in widths + [width]:
+        resized = image if target == width else image.resize((target, max(1, round(height * target / width))),
+                                                             Image.LANCZOS)
+        webp_key = derivative_key(key, target if target < width else None, "webp")
+        _store(resized, bucket, webp_key, "WEBP", "image/webp", quality=WEBP_QUALITY, method=4)
+        webp.append((derivative_url(url, key, webp_key), target))
+        if target == width:
+            continue
+        if alpha:
+            thumbnail_key = derivative_key(key, target, "png")
+            _store(resized, bucket, thumbnail_key, "PNG", "image/png", optimize=True)
+        else:
+            thumbnail_key = derivative_key(key, target, "jpg")
+            _store(resized, bucket, thumbnail_key, "JPEG", "image/jpeg", quality=JPEG_QUALITY, optimize=True, progressive=True)
+        default.append((derivative_url(url, key, thumbnail_key), target))
+    default.append((url, width))
+
+    return {"webp": srcset(webp), "default": srcset(default)}, (width, height)
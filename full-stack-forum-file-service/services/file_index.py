@@ -0,0 +1,121 @@
+import os
+import sys
+import redis
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from shared.redis_client import get_redis
+
+# file:blob:<sha256> -> hash {key, size, contentType, refs}, file:key:<object key> -> sha256
+BLOB_PREFIX = "file:blob:"
+KEY_PREFIX = "file:key:"
+
+# Take a reference on an indexed blob. Returns its object key, or nil if the content is new.
+_REFERENCE = """
+local key = redis.call("hget", KEYS[1], "key")
+if key then
+    redis.call("hincrby", KEYS[1], "refs", 1)
+end
+return key
+"""
+
+# Index a freshly stored object, or reference the blob a concurrent upload indexed first.
+# Returns the object key that holds the content.
+_REGISTER = """
+local key = redis.call("hget", KEYS[1], "key")
+if key then
+    redis.call("hincrby", KEYS[1], "refs", 1)
+    return key
+end
+redis.call("hset", KEYS[1], "key", ARGV[1], "size", ARGV[2], "contentType", ARGV[3], "refs", 1)
+redis.call("set", KEYS[2], ARGV[4])
+return ARGV[1]
+"""
+
+# Drop one reference by object key. Returns -1 for untracked keys, else the references left;
+# at 0 the index entries are gone and the caller removes the object.
+_RELEASE = """
+local digest = redis.call("get", KEYS[1])
+if not digest then
+    return -1
+end
+local blob = ARGV[1] .. digest
+local refs = redis.call("hincrby", blob, "refs", -1)
+if refs <= 0 then
+    redis.call("del", blob, KEYS[1])
+    return 0
+end
+return refs
+"""
+
+UNTRACKED = -1
+
+class FileIndex:
+    """
+    Content-addressed index of stored objects: SHA-256 of the content -> object key, with a count
+    of the uploads referencing it. Duplicate uploads take a reference instead of storing a copy,
+    and the object is only deleted when the last reference is released.
+    """
+    def __init__(self, client_factory=get_redis):
+        self._client_factory = client_factory
+        self._scripts = None
+
+    def _run(self, name, keys, args=()):
+        client = self._client_factory()
+        if self._scripts is None:
+            self._scripts = {
+                "reference": client.register_script(_REFERENCE),
+                "register": client.register_script(_REGISTER),
+                "release": client.register_script(_RELEASE),
+            }
+        return self._scripts[name](keys=keys, args=args, client=client)
+
+    def reference(self, sha256):
+        """
+        Object key already holding this content, with a reference taken on it; None if the content is new.
+        Without Redis every upload counts as new, so uploads keep working undeduplicated.
+        """
+        try:
+            return self._run("reference", [BLOB_PREFIX + sha256])
+        except redis.exceptions.RedisError as e:
+            print(f"❌ File index unavailable, storing without dedup: {e}")
+            return None
+
+    def register(self, sha256, key, size, content_type):
+        """
+        Index a stored object and return the key that holds the content. That differs from `key` if an
+        identical upload was indexed first, and the caller then deletes its own copy. Without Redis the
+        object stays unindexed, and deleting it removes it right away.
+        """
+        try:
+            return self._run("register", [BLOB_PREFIX + sha256, KEY_PREFIX + key],
+                             [key, size, content_type or "application/octet-stream", sha256])
+        except redis.exceptions.RedisError as e:
+            print(f"❌ File index unavailable, {key} is not indexed: {e}")
+            return key
+
+    def reference_key(self, key):
+        """Take a reference on an indexed object by its key. False if the key is not indexed."""
+        sha256 = self.lookup_key(key)
+        return sha256 is not None and self.reference(sha256) == key
+
+    def release(self, key):
+        """Drop one reference. Returns the references left, 0 when the object should be deleted, or UNTRACKED."""
+        return int(self._run("release", [KEY_PREFIX + key], [BLOB_PREFIX]))
+
+    def lookup(self, sha256):
+        """Indexed metadata for this content without taking a reference, or None."""
+        try:
+            return self._client_factory().hgetall(BLOB_PREFIX + sha256) or None
+        except redis.exceptions.RedisError as e:
+            print(f"❌ File index unavailable: {e}")
+            return None
+
+    def lookup_key(self, key):
+        """SHA-256 of an indexed object, or None."""
+        try:
+            return self._client_factory().get(KEY_PREFIX + key)
+        except redis.exceptions.RedisError as e:
+            print(f"❌ File index unavailable: {e}")
+            return None
+
+file_index = FileIndex()
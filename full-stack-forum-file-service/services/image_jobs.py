@@ -0,0 +1,48 @@
+import json
+import os
+import sys
+import threading
+import pika
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from shared.derivatives import IMAGE_QUEUE, image_job, is_image
+
+RABBITMQ_HOST = os.getenv("RABBITMQ_HOST", "localhost")
+
+class ImageJobPublisher:
+    """
+    Queues derivative jobs for the image worker over one RabbitMQ connection shared by request threads.
+    Publishing is best effort: an image whose job is lost is still served at its original size.
+    """
+    def __init__(self, host=RABBITMQ_HOST, queue=IMAGE_QUEUE):
+        self.host = host
+        self.queue = queue
+        self._lock = threading.Lock()  # pika connections are not thread-safe
+        self._connection = None
+        self._channel = None
+
+    def _connect(self):
+        if self._connection is None or self._connection.is_closed:
+            self._connection = pika.BlockingConnection(pika.ConnectionParameters(self.host))
+            self._channel = self._connection.channel()
+            self._channel.queue_declare(queue=self.queue, durable=True)
+
+    def publish(self, bucket, key, url, content_type):
+        """Queue a job for key if it is an image; other files are ignored."""
+        if not is_image(content_type):
+            return
+        body = json.dumps(image_job(bucket, key, url, content_type))
+        with self._lock:
+            # An idle connection may have been dropped by the broker since the last publish, reconnect once
+            for attempt in range(2):
+                try:
+                    self._connect()
+                    self._channel.basic_publish(exchange="", routing_key=self.queue, body=body,
+                                                properties=pika.BasicProperties(delivery_mode=2))
+                    return
+                except pika.exceptions.AMQPError as e:
+                    self._connection = None
+                    error = e
+        print(f"❌ Failed to queue variants of {key}: {error}")
+
+image_jobs = ImageJobPublisher()
@@ -0,0 +1,103 @@
+import os
+import sys
+import redis
+from botocore.exceptions import ClientError
+from services.streaming_upload import upload_executor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from shared.cache import TTLCache
+from shared.redis_client import get_redis
+
+# file:meta:<object key> -> hash {size, contentType, sha256, width, height}
+META_PREFIX = "file:meta:"
+METADATA_CACHE_SIZE = int(os.getenv("METADATA_CACHE_SIZE", "10000"))
+# Bounds how long another process may serve metadata of a deleted object, or miss dimensions added later
+METADATA_CACHE_TTL = int(os.getenv("METADATA_CACHE_TTL", "300"))
+_INT_FIELDS = ("size", "width", "height")
+
+def _decode(fields):
+    metadata = {"size": None, "contentType": None, "sha256": None, "width": None, "height": None}
+    for name, value in fields.items():
+        if name in metadata:
+            metadata[name] = int(value) if name in _INT_FIELDS else value
+    return metadata
+
+class FileMetadataStore:
+    """
+    Metadata of stored objects (size, content type, SHA-256, image dimensions), written to Redis as
+    files are stored and served from a per-process LRU in front of it. Objects stored before the
+    store existed are looked up in S3 once and backfilled. Metadata is immutable per key apart from
+    the dimensions, which the image worker adds once it has decoded the image.
+    """
+    def __init__(self, s3_client, bucket, client_factory=get_redis, maxsize=METADATA_CACHE_SIZE, ttl=METADATA_CACHE_TTL):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self._client_factory = client_factory
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def _head(self, key):
+        try:
+            head = self.s3_client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return {"size": head["ContentLength"], "contentType": head.get("ContentType")}
+
+    def record(self, key, size, content_type, sha256=None, width=None, height=None):
+        """Store the metadata of a new object. Best effort: a miss is backfilled from S3 later."""
+        fields = {"size": size, "contentType": content_type or "application/octet-stream",
+                  "sha256": sha256, "width": width, "height": height}
+        fields = {name: value for name, value in fields.items() if value is not None}
+        try:
+            self._client_factory().hset(META_PREFIX + key, mapping=fields)
+        except redis.exceptions.RedisError as e:
+            print(f"❌ Could not record metadata of {key}: {e}")
+        self._cache.delete(key)
+
+    def record_dimensions(self, dimensions):
+        """Add the pixel size of many images at once, {key: (width, height)}. Raises RedisError."""
+        pipe = self._client_factory().pipeline(transaction=False)
+        for key, (width, height) in dimensions.items():
+            pipe.hset(META_PREFIX + key, mapping={"width": width, "height": height})
+        pipe.execute()
+
+    def forget(self, key):
+        try:
+            self._client_factory().delete(META_PREFIX + key)
+        except redis.exceptions.RedisError as e:
+            print(f"❌ Could not forget metadata of {key}: {e}")
+        self._cache.delete(key)
+
+    def get_many(self, keys):
+        """
+        {key: metadata} for the keys that exist, from the LRU, then one Redis pipeline, then concurrent
+        HEADs for whatever is left. Keys with no object are left out.
+        """
+        found = self._cache.get_many(keys)
+        misses = [key for key in dict.fromkeys(keys) if key not in found]
+
+        if misses:
+            try:
+                pipe = self._client_factory().pipeline(transaction=False)
+                for key in misses:
+                    pipe.hgetall(META_PREFIX + key)
+                for key, fields in zip(misses, pipe.execute()):
+                    # Dimensions alone (recorded by the worker for an object that predates the store) are a miss
+                    if fields.get("size"):
+                        found[key] = _decode(fields)
+                        self._cache.set(key, found[key])
+            except redis.exceptions.RedisError as e:
+                print(f"❌ Metadata store unavailable, asking S3: {e}")
+            misses = [key for key in misses if key not in found]
+
+        # Backfill objects that predate the store
+        for key, head in zip(misses, upload_executor.map(self._head, misses)):
+            if head is not None:
+                self.record(key, head["size"], head["contentType"])
+                found[key] = _decode(head)
+                self._cache.set(key, found[key])
+        return found
+
+    def get(self, key):
+        return self.get_many([key]).get(key)
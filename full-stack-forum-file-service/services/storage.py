@@ -0,0 +1,89 @@
+import hashlib
+import os
+import sys
+import uuid
+import boto3
+from botocore.config import Config
+from dotenv import load_dotenv
+from services.file_index import UNTRACKED, file_index
+from services.metadata import FileMetadataStore
+from services.streaming_upload import READ_CHUNK_SIZE, UPLOAD_WORKERS
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from shared.derivatives import derivative_keys, forget_srcset
+
+load_dotenv()
+
+# AWS S3 Configuration
+S3_BUCKET = os.getenv("S3_BUCKET", "forum-platform-post-service-bucket")
+S3_REGION = os.getenv("S3_REGION", "us-east-2")
+S3_ACCESS_KEY = os.getenv("AWS_ACCESS_KEY")
+S3_SECRET_KEY = os.getenv("AWS_SECRET_KEY")
+# Point at a local S3 stand-in such as MinIO, e.g. http://localhost:9000
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+S3_PUBLIC_URL = os.getenv("S3_PUBLIC_URL", f"https://{S3_BUCKET}.s3.{S3_REGION}.amazonaws.com")
+
+s3_client = boto3.client(
+    "s3",
+    region_name=S3_REGION,
+    aws_access_key_id=S3_ACCESS_KEY,
+    aws_secret_access_key=S3_SECRET_KEY,
+    endpoint_url=S3_ENDPOINT_URL,
+    # One connection per upload worker, plus headroom for request threads
+    config=Config(max_pool_connections=UPLOAD_WORKERS + 10)
+)
+
+file_metadata = FileMetadataStore(s3_client, S3_BUCKET)
+
+def new_file_key(filename, prefix="uploads"):
+    file_extension = (filename or "").split('.')[-1]
+    file_id = str(uuid.uuid4())
+    return file_id, f"{prefix}/{file_id}.{file_extension}"
+
+def file_url(file_key):
+    return f"{S3_PUBLIC_URL}/{file_key}"
+
+def file_id_of(file_key):
+    return file_key.rsplit("/", 1)[-1].split(".")[0]
+
+def describe_file(file_key, metadata):
+    """API representation of a stored object and its metadata."""
+    return {"file_id": file_id_of(file_key), "key": file_key, "file_url": file_url(file_key), **metadata}
+
+def store_file(file, file_key):
+    """
+    Store an uploaded (already spooled) file under file_key, unless identical content is indexed,
+    in which case that object is referenced instead. Returns the key holding the content.
+    """
+    sha256 = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: file.stream.read(READ_CHUNK_SIZE), b""):
+        sha256.update(chunk)
+        size += len(chunk)
+    digest = sha256.hexdigest()
+
+    existing = file_index.reference(digest)
+    if existing:
+        return existing
+
+    file.stream.seek(0)
+    s3_client.upload_fileobj(file.stream, S3_BUCKET, file_key, ExtraArgs={"ContentType": file.mimetype or "application/octet-stream"})
+    stored_key = file_index.register(digest, file_key, size, file.mimetype)
+    if stored_key != file_key:
+        s3_client.delete_object(Bucket=S3_BUCKET, Key=file_key)
+    else:
+        file_metadata.record(file_key, size, file.mimetype, sha256=digest)
+    return stored_key
+
+def release_file(file_key):
+    """Drop one reference to an object, deleting it from S3 with the last one. Returns True if it was deleted."""
+    remaining = file_index.release(file_key)
+    if remaining in (0, UNTRACKED):
+        s3_client.delete_object(Bucket=S3_BUCKET, Key=file_key)
+        file_metadata.forget(file_key)
+        if forget_srcset(file_url(file_key)):
+            s3_client.delete_objects(Bucket=S3_BUCKET, Delete={
+                "Objects": [{"Key": key} for key in derivative_keys(file_key)], "Quiet": True
+            })
+        return True
+    return False
@@ -0,0 +1,211 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from werkzeug.sansio.multipart import Data, Epilogue, File, MultipartDecoder, NeedData
+from services.file_index import UNTRACKED
+
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "8"))
+# S3 requires every part but the last to be at least 5 MiB
+UPLOAD_PART_SIZE = max(int(os.getenv("UPLOAD_PART_SIZE", str(8 * 1024 * 1024))), 5 * 1024 * 1024)
+# Parts buffered or in flight per request, so a request holds at most (this + 1) * UPLOAD_PART_SIZE bytes
+UPLOAD_MAX_INFLIGHT_PARTS = int(os.getenv("UPLOAD_MAX_INFLIGHT_PARTS", "4"))
+UPLOAD_MAX_REQUEST_BYTES = int(os.getenv("UPLOAD_MAX_REQUEST_BYTES", str(100 * 1024 * 1024)))
+READ_CHUNK_SIZE = 64 * 1024
+
+# Shared by every request; requests are kept from starving each other by their in-flight part limit
+upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="s3-upload")
+
+class UploadTooLarge(Exception):
+    pass
+
+class UploadSession:
+    """
+    The S3 uploads started by one request. Parts of every file in it share one in-flight limit,
+    and abort() cleans up whatever did not complete. With a FileIndex, content already stored is
+    referenced instead of stored again.
+    """
+    def __init__(self, s3_client, bucket, index=None, max_inflight_parts=UPLOAD_MAX_INFLIGHT_PARTS):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.index = index
+        self._slots = threading.BoundedSemaphore(max_inflight_parts)
+        self._writers = []
+
+    def submit(self, fn, *args):
+        """Run fn in the upload pool, blocking the caller while the request is at its in-flight limit."""
+        self._slots.acquire()
+        try:
+            future = upload_executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def open(self, key, content_type):
+        writer = S3StreamWriter(self, key, content_type)
+        self._writers.append(writer)
+        return writer
+
+    def finish(self):
+        """Wait for every file to land in S3, raising the first upload error."""
+        for writer in self._writers:
+            writer.result()
+
+    def abort(self):
+        for writer in self._writers:
+            writer.abort()
+
+class S3StreamWriter:
+    """
+    Streams one object to S3: bytes are cut into UPLOAD_PART_SIZE parts that upload in the pool while
+    the request body is still being read. Objects that fit in one part are stored with a single PUT.
+    The content is hashed on the way through; once the hash is known, a duplicate of an indexed object
+    skips the PUT (or abandons its multipart upload) and `key` becomes the existing object's key.
+    """
+    def __init__(self, session, key, content_type):
+        self.session = session
+        self.key = key
+        self.content_type = content_type or "application/octet-stream"
+        self.size = 0
+        self._buffer = bytearray()
+        self._upload_id = None
+        self._parts = []  # futures of {"PartNumber", "ETag"}
+        self._put = None  # future of the single PUT of a small object
+        self._closed = False
+        self._completed = False
+        self._sha256 = hashlib.sha256()
+        self.deduplicated = False
+
+    @property
+    def sha256(self):
+        return self._sha256.hexdigest()
+
+    def write(self, data):
+        self._sha256.update(data)
+        self._buffer += data
+        self.size += len(data)
+        while len(self._buffer) >= UPLOAD_PART_SIZE:
+            part, self._buffer = bytes(self._buffer[:UPLOAD_PART_SIZE]), self._buffer[UPLOAD_PART_SIZE:]
+            self._submit_part(part)
+
+    def _submit_part(self, body):
+        if self._upload_id is None:
+            self._upload_id = self.session.s3_client.create_multipart_upload(
+                Bucket=self.session.bucket, Key=self.key, ContentType=self.content_type
+            )["UploadId"]
+        self._parts.append(self.session.submit(self._upload_part, len(self._parts) + 1, body))
+
+    def _upload_part(self, part_number, body):
+        response = self.session.s3_client.upload_part(
+            Bucket=self.session.bucket, Key=self.key, UploadId=self._upload_id, PartNumber=part_number, Body=body
+        )
+        return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+    def close(self):
+        """Flush the tail of the object. Its upload carries on in the background until result()."""
+        body, self._buffer = bytes(self._buffer), bytearray()
+        self._closed = True
+        if self._upload_id is None:
+            if self._reference_existing():
+                return
+            self._put = self.session.submit(self._put_object, body)
+        elif body:
+            self._submit_part(body)
+
+    def _reference_existing(self):
+        existing = self.session.index.reference(self.sha256) if self.session.index else None
+        if existing:
+            self.key, self.deduplicated, self._completed = existing, True, True
+        return bool(existing)
+
+    def _register(self):
+        if self.session.index is None:
+            return
+        key = self.session.index.register(self.sha256, self.key, self.size, self.content_type)
+        if key != self.key:
+            # An identical upload was indexed first, keep its object and drop ours
+            self.session.s3_client.delete_object(Bucket=self.session.bucket, Key=self.key)
+            self.key, self.deduplicated = key, True
+
+    def _put_object(self, body):
+        self.session.s3_client.put_object(Bucket=self.session.bucket, Key=self.key, Body=body, ContentType=self.content_type)
+
+    def result(self):
+        """
+        Wait for the object to be stored. A multipart upload is completed here, on the caller's thread,
+        so pool workers never block on other pool tasks.
+        """
+        if not self._closed:
+            raise RuntimeError(f"{self.key} was not closed")
+        if self._completed:
+            return
+        if self._put is not None:
+            self._put.result()
+        else:
+            parts = [future.result() for future in self._parts]
+            upload_key = self.key
+            if self._reference_existing():
+                self.session.s3_client.abort_multipart_upload(Bucket=self.session.bucket, Key=upload_key, UploadId=self._upload_id)
+                return
+            self.session.s3_client.complete_multipart_upload(
+                Bucket=self.session.bucket, Key=self.key, UploadId=self._upload_id, MultipartUpload={"Parts": parts}
+            )
+        self._completed = True
+        self._register()
+
+    def abort(self):
+        """Remove whatever this writer stored or referenced, completed or not."""
+        wait(self._parts + ([self._put] if self._put is not None else []))
+        try:
+            if self._upload_id is not None and not self._completed:
+                self.session.s3_client.abort_multipart_upload(Bucket=self.session.bucket, Key=self.key, UploadId=self._upload_id)
+            elif self._completed and self.session.index is not None:
+                # Only the last reference takes the object with it
+                if self.session.index.release(self.key) in (0, UNTRACKED):
+                    self.session.s3_client.delete_object(Bucket=self.session.bucket, Key=self.key)
+            elif self._completed or (self._put is not None and self._put.exception() is None):
+                self.session.s3_client.delete_object(Bucket=self.session.bucket, Key=self.key)
+        except Exception as e:
+            print(f"❌ Could not clean up upload of {self.key}: {e}")
+
+def stream_multipart_upload(stream, boundary, session, key_for, max_bytes=UPLOAD_MAX_REQUEST_BYTES):
+    """
+    Parse a multipart/form-data body from `stream` and pipe every "file" part into S3 as it is read,
+    without spooling it to memory or disk first. `key_for(filename)` names each object.
+    Returns [(filename, writer)] once every object is stored, the S3StreamWriter giving the key, size,
+    content type and hash of each; raises UploadTooLarge past max_bytes.
+    """
+    decoder = MultipartDecoder(boundary.encode("latin-1"))
+    files = []
+    writer = None
+    received = 0
+
+    while True:
+        chunk = stream.read(READ_CHUNK_SIZE)
+        received += len(chunk)
+        if received > max_bytes:
+            raise UploadTooLarge(f"Request body exceeds {max_bytes} bytes")
+        decoder.receive_data(chunk or None)
+
+        event = decoder.next_event()
+        while not isinstance(event, (NeedData, Epilogue)):
+            if isinstance(event, File) and event.name == "file":
+                key = key_for(event.filename)
+                writer = session.open(key, event.headers.get("Content-Type"))
+                files.append((event.filename, writer))
+            elif isinstance(event, Data) and writer is not None:
+                writer.write(event.data)
+                if not event.more_data:
+                    writer.close()
+                    writer = None
+            event = decoder.next_event()
+
+        if isinstance(event, Epilogue) or not chunk:
+            break
+
+    if writer is not None:
+        raise ValueError("Request body ended in the middle of a file")
+    session.finish()
+    return files
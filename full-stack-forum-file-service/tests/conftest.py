@@ -0,0 +1,40 @@
+import os
+import sys
+import fakeredis
+import pytest
+from moto import mock_aws
+
+# Settings are read at import, so they are fixed before the app is imported
+os.environ.update(AWS_ACCESS_KEY="testing", AWS_SECRET_KEY="testing", S3_BUCKET="test-bucket",
+                  S3_REGION="us-east-2", UPLOAD_PART_SIZE=str(5 * 1024 * 1024),
+                  UPLOAD_MAX_REQUEST_BYTES=str(20 * 1024 * 1024))
+os.environ.pop("S3_ENDPOINT_URL", None)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app import app as flask_app  # noqa: E402
+from services import S3_BUCKET, image_jobs, s3_client  # noqa: E402
+from services.storage import S3_REGION  # noqa: E402
+import shared.redis_client as redis_client  # noqa: E402  (on sys.path once the services are imported)
+
+@pytest.fixture
+def redis(monkeypatch):
+    client = fakeredis.FakeStrictRedis(decode_responses=True)
+    monkeypatch.setattr(redis_client, "_client", client)
+    return client
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        s3_client.create_bucket(Bucket=S3_BUCKET, CreateBucketConfiguration={"LocationConstraint": S3_REGION})
+        yield s3_client
+
+@pytest.fixture
+def published(monkeypatch):
+    """Image jobs the request would have queued on RabbitMQ."""
+    jobs = []
+    monkeypatch.setattr(image_jobs, "publish", lambda bucket, key, url, content_type: jobs.append((key, content_type)))
+    return jobs
+
+@pytest.fixture
+def client(redis, s3, published):
+    return flask_app.test_client()
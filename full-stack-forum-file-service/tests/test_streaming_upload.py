@@ -0,0 +1,70 @@
+import hashlib
+import io
+import os
+from services import S3_BUCKET, UPLOAD_MAX_REQUEST_BYTES
+from services.file_index import BLOB_PREFIX
+
+def post_files(client, path, *files):
+    return client.post(path, data={"file": [(io.BytesIO(body), name, content_type) for name, body, content_type in files]},
+                       content_type="multipart/form-data")
+
+def stored_keys(s3):
+    return sorted(obj["Key"] for obj in s3.list_objects_v2(Bucket=S3_BUCKET).get("Contents", []))
+
+def key_of(file):
+    return file["file_url"].split(".amazonaws.com/", 1)[1]
+
+def test_stream_upload_stores_each_part(client, s3, published):
+    large = os.urandom(12 * 1024 * 1024 + 7)  # three multipart parts
+    response = post_files(client, "/files/upload/stream",
+                          ("notes.txt", b"hello", "text/plain"), ("photo.png", large, "image/png"))
+
+    assert response.status_code == 201
+    files = response.get_json()["files"]
+    assert [file["size"] for file in files] == [5, len(large)]
+    for file, body, content_type in zip(files, (b"hello", large), ("text/plain", "image/png")):
+        stored = s3.get_object(Bucket=S3_BUCKET, Key=key_of(file))
+        assert stored["Body"].read() == body
+        assert stored["ContentType"] == content_type
+    assert published == [(key_of(files[0]), "text/plain"), (key_of(files[1]), "image/png")]
+    assert client.get(f"/files/upload/{key_of(files[0])}").get_json()["file"]["size"] == 5
+
+def test_stream_upload_deduplicates_content(client, s3, redis):
+    body = os.urandom(64 * 1024)
+    first = post_files(client, "/files/upload/stream", ("a.bin", body, "application/octet-stream")).get_json()["files"][0]
+    second = post_files(client, "/files/upload/stream", ("b.bin", body, "application/octet-stream")).get_json()["files"][0]
+
+    assert key_of(second) == key_of(first)
+    assert stored_keys(s3) == [key_of(first)]
+    assert redis.hget(BLOB_PREFIX + hashlib.sha256(body).hexdigest(), "refs") == "2"
+
+def test_spooled_and_streamed_uploads_share_content(client, s3):
+    body = b"same bytes either way"
+    spooled = post_files(client, "/files/upload", ("a.txt", body, "text/plain")).get_json()["files"][0]
+    streamed = post_files(client, "/files/upload/stream", ("b.txt", body, "text/plain")).get_json()["files"][0]
+
+    assert key_of(streamed) == key_of(spooled)
+    assert stored_keys(s3) == [key_of(spooled)]
+
+def test_deduplicated_object_is_deleted_with_its_last_reference(client, s3):
+    body = b"shared"
+    key = key_of(post_files(client, "/files/upload/stream", ("a.txt", body, "text/plain")).get_json()["files"][0])
+    post_files(client, "/files/upload/stream", ("b.txt", body, "text/plain"))
+
+    assert client.delete(f"/files/upload/{key}").get_json()["message"] == "File reference removed"
+    assert stored_keys(s3) == [key]
+    assert client.delete(f"/files/upload/{key}").get_json()["message"] == "File deleted successfully"
+    assert stored_keys(s3) == []
+
+def test_oversized_stream_leaves_nothing_behind(client, s3, redis):
+    response = post_files(client, "/files/upload/stream", ("small.txt", b"small", "text/plain"),
+                          ("huge.bin", os.urandom(UPLOAD_MAX_REQUEST_BYTES + 1), "application/octet-stream"))
+
+    assert response.status_code == 413
+    assert stored_keys(s3) == []
+    assert not s3.list_multipart_uploads(Bucket=S3_BUCKET).get("Uploads")
+    assert not redis.keys(BLOB_PREFIX + "*")
+
+def test_stream_upload_without_files(client):
+    assert client.post("/files/upload/stream", data={"other": "x"}, content_type="multipart/form-data").status_code == 400
+    assert client.post("/files/upload/stream", json={}).status_code == 400
@@ -46,6 +46,13 @@ const GlobalNavBar = () => {
   }, [token, user]); // ✅ Re-run when token or user changes (for real-time updates)
 
   const handleLogout = () => {
+    // Revoke the token server-side; local logout goes ahead even if this fails
+    if (token) {
+      fetch("http://127.0.0.1:5009/auth/logout", {
+        method: "POST",
+        headers: { Authorization: `Bearer ${token}` },
+      }).catch((error) => console.error("❌ Failed to revoke token:", error));
+    }
     dispatch(logout());
     navigate("/users/login");
   };
@@ -0,0 +1,16 @@
+// Image served from its resized/WebP variants when the file service has built them
+// ({ webp, default } srcset strings), falling back to the original URL.
+const ResponsiveImage = ({ src, srcset, sizes, ...props }) => {
+  if (!srcset) {
+    return <img src={src} {...props} />;
+  }
+
+  return (
+    <picture>
+      <source type="image/webp" srcSet={srcset.webp} sizes={sizes} />
+      <img src={src} srcSet={srcset.default} sizes={sizes} {...props} />
+    </picture>
+  );
+};
+
+export default ResponsiveImage;
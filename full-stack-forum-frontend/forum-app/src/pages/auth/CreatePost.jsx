@@ -2,6 +2,7 @@ import React, { useState } from "react";
 import axios from "axios";
 import { useNavigate } from "react-router-dom";
 import { jwtDecode } from "jwt-decode";
+import { uploadFiles } from "../../utils/uploadFiles";
 
 const CreatePostForm = () => {
   const [title, setTitle] = useState("");
@@ -39,18 +40,13 @@ const CreatePostForm = () => {
       formData.append("content", content);
       formData.append("status", status);
 
-      // Append multiple images
-      images.forEach((image) => {
-        formData.append("images", image); 
-      });
-
-      console.log("FormData images:", formData.getAll("images"));
-
-      attachments.forEach((attachment, index) => {
-        formData.append(`attachments[${index}]`, attachment);
-      });
-
-      console.log("FormData images:", formData.getAll("images"));
+      // Upload images and attachments directly to storage, the post only carries their keys
+      const [imageKeys, attachmentKeys] = await Promise.all([
+        uploadFiles(images),
+        uploadFiles(attachments),
+      ]);
+      imageKeys.forEach((key) => formData.append("imageKeys", key));
+      attachmentKeys.forEach((key) => formData.append("attachmentKeys", key));
 
       const response = await axios.post(
         "http://127.0.0.1:5009/posts",
@@ -2,6 +2,7 @@ import React, { useState, useEffect } from "react";
 import axios from "axios";
 import { useParams, useNavigate, Link } from "react-router-dom";
 import { FiX } from "react-icons/fi";
+import { uploadFiles } from "../../utils/uploadFiles";
 
 const EditPostForm = () => {
   const { postId } = useParams();
@@ -96,13 +97,19 @@ const EditPostForm = () => {
       // pass the current exists images
       const updatedImages = existingImages.filter((img) => !removedImages.includes(img));
       formData.append("images", updatedImages.join(","));
-      newImages.forEach((image) => formData.append("newImages", image));
 
 
       // pass new uploaded images
       const updatedAttachments = existingAttachments.filter((att) => !removedAttachments.includes(att));
       formData.append("attachments", updatedAttachments.join(","));
-      newAttachments.forEach((file) => formData.append("newAttachments", file));
+
+      // new files go directly to storage, the post only carries their keys
+      const [newImageKeys, newAttachmentKeys] = await Promise.all([
+        uploadFiles(newImages),
+        uploadFiles(newAttachments),
+      ]);
+      newImageKeys.forEach((key) => formData.append("newImageKeys", key));
+      newAttachmentKeys.forEach((key) => formData.append("newAttachmentKeys", key));
 
       await axios.put(`http://127.0.0.1:5009/posts/${postId}`, formData, {
         headers: {
@@ -5,6 +5,7 @@ import { useNavigate } from "react-router-dom";
 
 const HistoryPage = () => {
   const [history, setHistory] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const navigate = useNavigate();
@@ -34,19 +35,23 @@ const HistoryPage = () => {
     }
   }, []);
 
-  // Fetch user history
-  const fetchHistory = async () => {
+  // Fetch a page of user history, appending to what is loaded when a cursor is given
+  const fetchHistory = async (cursor) => {
     try {
       const token = localStorage.getItem("token");
       const response = await axios.get("http://127.0.0.1:5009/history/", {
         headers: {
           Authorization: `Bearer ${token}`,
         },
+        params: cursor ? { cursor } : {},
       });
 
       if (response.data.history) {
-        setHistory(response.data.history);
+        setHistory((prevHistory) =>
+          cursor ? [...prevHistory, ...response.data.history] : response.data.history
+        );
       }
+      setNextCursor(response.data.nextCursor || null);
       setLoading(false);
     } catch (err) {
       console.error("Failed to fetch history:", err);
@@ -117,6 +122,14 @@ const HistoryPage = () => {
           ))}
         </ul>
       )}
+      {nextCursor && (
+        <button
+          onClick={() => fetchHistory(nextCursor)}
+          className="mt-4 bg-blue-500 text-white px-4 py-2 rounded-md hover:bg-blue-600 transition duration-300"
+        >
+          Load more
+        </button>
+      )}
     </div>
   );
 };
@@ -5,6 +5,7 @@ import { fetchUser } from "../../redux/slices/userSlice.js";
 import { useDispatch, useSelector } from "react-redux";
 import { FiDownload } from "react-icons/fi";
 import { jwtDecode } from "jwt-decode";
+import ResponsiveImage from "../../components/ResponsiveImage";
 
 const PostDetailPage = () => {
   const { postId } = useParams();
@@ -13,10 +14,12 @@ const PostDetailPage = () => {
   const [post, setPost] = useState(null);
   const user = useSelector((state) => state.user?.users[post?.userId] || {});
   const [replies, setReplies] = useState(null);
+  const [repliesCursor, setRepliesCursor] = useState(null); // next page of replies, null on the last one
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState("");
   const [newReply, setNewReply] = useState(""); // To handle new reply input
   const [replyLoading, setReplyLoading] = useState(false);
+  const [attachmentFiles, setAttachmentFiles] = useState({}); // object key -> file metadata
 
   // resolve images and attachments into array
   // const images = post?.images && typeof post.images === "string"
@@ -25,15 +28,41 @@ const PostDetailPage = () => {
   const images = post?.images ? post.images.split(",").map(img => img.trim()) : [];
   const attachments = post?.attachments ? post.attachments.split(",").map(file => file.trim()) : [];
 
-  const fetchReplies = async () => {
-    setLoading(true);
+  const objectKey = (fileUrl) => decodeURIComponent(new URL(fileUrl).pathname.slice(1));
+  const formatSize = (bytes) =>
+    bytes >= 1024 * 1024 ? `${(bytes / (1024 * 1024)).toFixed(1)} MB` : `${Math.max(1, Math.round(bytes / 1024))} KB`;
+
+  // Sizes of all attachments in one request
+  useEffect(() => {
+    if (!post?.attachments) return;
+    const keys = post.attachments.split(",").map((file) => {
+      try {
+        return objectKey(file.trim());
+      } catch {
+        return null;
+      }
+    }).filter(Boolean);
+    if (!keys.length) return;
+
+    axios
+      .post(
+        "http://127.0.0.1:5009/files/metadata",
+        { keys },
+        { headers: { Authorization: `Bearer ${localStorage.getItem("token")}` } }
+      )
+      .then((response) => setAttachmentFiles(response.data.files))
+      .catch((err) => console.error("Error fetching attachment details:", err));
+  }, [post?.attachments]);
+
+  // Active replies newest first, one page at a time; a cursor appends the next page
+  const fetchReplies = async (cursor = null) => {
+    if (!cursor) setLoading(true);
     try {
       const response = await axios.get(
-        `http://127.0.0.1:5003/replies/post/${postId}`
+        `http://127.0.0.1:5003/replies/post/${postId}`,
+        { params: cursor ? { cursor } : {} }
       );
-      let newReplies = Array.isArray(response.data)
-        ? response.data.filter((reply) => reply.reply.isActive)
-        : [];
+      let newReplies = response.data.replies || [];
 
       // Fetch user data for each reply and attach to reply object
       const enrichedReplies = await Promise.all(
@@ -65,7 +94,8 @@ const PostDetailPage = () => {
         })
       );
 
-      setReplies(enrichedReplies);
+      setReplies((prevReplies) => (cursor ? [...(prevReplies || []), ...enrichedReplies] : enrichedReplies));
+      setRepliesCursor(response.data.nextCursor);
     } catch (err) {
       console.error("Error fetching replies:", err);
       setError("Error fetching replies. Please try again later.");
@@ -230,9 +260,11 @@ const PostDetailPage = () => {
               <h3 className="text-xl font-semibold mb-3">Images</h3>
               <div className="grid grid-cols-2 md:grid-cols-3 gap-4">
                 {images.map((image, index) => (
-                  <img
+                  <ResponsiveImage
                     key={index}
                     src={image}
+                    srcset={post.imageSrcset?.[image]}
+                    sizes="(min-width: 768px) 33vw, 50vw"
                     alt={`Post image ${index + 1}`}
                     className="rounded-lg shadow-xl hover:scale-105 transition-transform duration-300 max-h-[300px] object-contain"
                   />
@@ -249,12 +281,14 @@ const PostDetailPage = () => {
                   {attachments.map((fileUrl, index) => {
                     try {
                       const fileName = new URL(fileUrl).pathname.split("/").pop();
+                      const file = attachmentFiles[objectKey(fileUrl)];
                       return (
                         <li key={index} className="flex items-center gap-2 text-blue-600 hover:underline">
                           <FiDownload className="text-xl" />
                           <a href={fileUrl.trim()} download target="_blank" rel="noopener noreferrer">
                             {fileName}
                           </a>
+                          {file && <span className="text-sm text-gray-500">({formatSize(file.size)})</span>}
                         </li>
                       );
                     } catch (error) {
@@ -310,6 +344,14 @@ const PostDetailPage = () => {
                   No replies yet. Be the first to reply!
                 </p>
               )}
+              {repliesCursor && (
+                <button
+                  onClick={() => fetchReplies(repliesCursor)}
+                  className="mt-2 text-blue-600 hover:underline"
+                >
+                  Load more replies
+                </button>
+              )}
             </div>
           </div>
 
@@ -10,7 +10,7 @@ const UserHomePage = () => {
   const navigate = useNavigate();
 
   // Get data from Redux
-  const { posts, loading, error } = useSelector((state) => state.posts);
+  const { posts, nextCursor, loading, error } = useSelector((state) => state.posts);
   const users = useSelector((state) => state.user?.users || {});
   const userError = useSelector((state) => state.user?.error);
   const role = useSelector((state) => state.auth.role);
@@ -23,18 +23,28 @@ const UserHomePage = () => {
   const [sortedPosts, setSortedPosts] = useState([]);
   const [filterType, setFilterType] = useState("published"); // "published", "banned", "deleted"
 
-  useEffect(() => {
-    dispatch(fetchPosts())
+  // Authors come with the feed; profiles are only fetched for those it could not include
+  const authors = { ...users };
+  posts.forEach((post) => {
+    if (post.author) authors[post.post.userId] = post.author;
+  });
+
+  // Fetch a page of posts (the first one when no cursor is given) and any authors missing from it
+  const loadPosts = (cursor) =>
+    dispatch(fetchPosts(cursor))
       .unwrap()
-      .then((posts) => {
+      .then(({ posts }) => {
         const uniqueUserIds = [
-          ...new Set(posts.map((post) => post.post.userId)),
+          ...new Set(posts.filter((post) => !post.author).map((post) => post.post.userId)),
         ];
         uniqueUserIds.forEach((userId) => {
-          if (userId) dispatch(fetchUser(userId));
+          if (userId && !users[userId]) dispatch(fetchUser(userId));
         });
       })
       .catch((err) => console.error("Error fetching posts:", err));
+
+  useEffect(() => {
+    loadPosts();
   }, [dispatch]);
 
   useEffect(() => {
@@ -214,8 +224,8 @@ const UserHomePage = () => {
         <option value="">Filter by Creator</option>
         {uniqueCreators.map((userId) => (
           <option key={userId} value={userId}>
-            {users[userId]?.firstName || "Unknown"}{" "}
-            {users[userId]?.lastName || ""}
+            {authors[userId]?.firstName || "Unknown"}{" "}
+            {authors[userId]?.lastName || ""}
           </option>
         ))}
       </select>
@@ -238,7 +248,7 @@ const UserHomePage = () => {
           <p className="text-gray-600 text-center">No posts found.</p>
         ) : (
           filteredPosts.map((post) => {
-            const user = users[post.post.userId] || {
+            const user = authors[post.post.userId] || {
               firstName: "Loading...",
               lastName: "",
             };
@@ -293,6 +303,14 @@ const UserHomePage = () => {
             );
           })
         )}
+        {nextCursor && !loading && (
+          <button
+            className="px-4 py-2 bg-blue-500 text-white rounded self-center"
+            onClick={() => loadPosts(nextCursor)}
+          >
+            Load more
+          </button>
+        )}
       </div>
     </div>
   );
@@ -2,6 +2,7 @@ import { useState, useEffect } from "react";
 import { jwtDecode } from "jwt-decode";
 import axios from "axios";
 import { useNavigate } from "react-router-dom";
+import ResponsiveImage from "../../components/ResponsiveImage";
 
 const UserProfilePage = () => {
   const [userProfile, setUserProfile] = useState(null);
@@ -117,8 +118,10 @@ const UserProfilePage = () => {
       <div className="flex flex-col items-center">
         {/* Profile Image */}
         <div className="relative">
-          <img
+          <ResponsiveImage
             src={userProfile?.profileImageURL || "/default-profile.png"}
+            srcset={userProfile?.profileImageSrcset}
+            sizes="128px"
             alt="Profile"
             className="w-32 h-32 rounded-full object-cover border-4 border-gray-300 shadow-md hover:shadow-lg transition"
           />
@@ -3,14 +3,17 @@ import axios from "axios";
 
 const API_URL = "http://127.0.0.1:5009/posts";
 
-export const fetchPosts = createAsyncThunk("posts/fetchPosts", async (_, { getState }) => {
+// Pass the `nextCursor` from the previous page to load the next one.
+// Feed entries are posts with their `author` attached (null if the user service was unavailable)
+export const fetchPosts = createAsyncThunk("posts/fetchPosts", async (cursor, { getState }) => {
   const token = getState().auth.token;
-  const response = await axios.get(API_URL, {
+  const response = await axios.get(`${API_URL}/feed`, {
     headers: {
       Authorization: `Bearer ${token}`,
     },
+    params: cursor ? { cursor } : {},
   });
-  return response.data;
+  return { posts: response.data.feed, nextCursor: response.data.nextCursor };
 });
 
 export const fetchPostById = createAsyncThunk(
@@ -33,6 +36,7 @@ const postsSlice = createSlice({
   name: "posts",
   initialState: {
     posts: [],
+    nextCursor: null,
     loading: false,
     error: null,
   },
@@ -45,7 +49,10 @@ const postsSlice = createSlice({
       })
       .addCase(fetchPosts.fulfilled, (state, action) => {
         state.loading = false;
-        state.posts = action.payload;
+        state.posts = action.meta.arg
+          ? [...state.posts, ...action.payload.posts]
+          : action.payload.posts;
+        state.nextCursor = action.payload.nextCursor;
       })
       .addCase(fetchPosts.rejected, (state, action) => {
         state.loading = false;
@@ -5,13 +5,20 @@ const POST_API_URL = "http://127.0.0.1:5009/posts";
  
 export const fetchPosts = createAsyncThunk("posts/fetchPosts", async () => {
   const user = JSON.parse(localStorage.getItem("user"));
-  const response = await axios.get(POST_API_URL, {
-    headers: { 'Authorization': `Bearer ${localStorage.getItem("token")}` },
-  });
-  
+  // Walk every page of the feed
+  const allPosts = [];
+  let cursor = null;
+  do {
+    const response = await axios.get(POST_API_URL, {
+      headers: { 'Authorization': `Bearer ${localStorage.getItem("token")}` },
+      params: cursor ? { cursor, limit: 100 } : { limit: 100 },
+    });
+    allPosts.push(...response.data.posts);
+    cursor = response.data.nextCursor;
+  } while (cursor);
 
   // Return all posts belonging to the user, regardless of status
-  const userPosts = response.data.filter((post) => post.post.userId === user.id);
+  const userPosts = allPosts.filter((post) => post.post.userId === user.id);
 
   return userPosts;
 });
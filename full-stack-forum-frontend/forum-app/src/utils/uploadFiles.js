@@ -0,0 +1,38 @@
+import axios from "axios";
+
+const sha256Hex = async (file) => {
+  const digest = await crypto.subtle.digest("SHA-256", await file.arrayBuffer());
+  return Array.from(new Uint8Array(digest), (byte) => byte.toString(16).padStart(2, "0")).join("");
+};
+
+// Upload files straight to storage with presigned URLs from the file service and
+// return their object keys, which the post service accepts instead of the files.
+// Files the user already uploaded are not uploaded again.
+export const uploadFiles = async (files) => {
+  if (!files.length) return [];
+
+  const hashes = await Promise.all(files.map(sha256Hex));
+  const { data } = await axios.post(
+    "http://127.0.0.1:5009/files/presign",
+    {
+      method: "PUT",
+      files: files.map((file, index) => ({
+        filename: file.name,
+        contentType: file.type || "application/octet-stream",
+        size: file.size,
+        sha256: hashes[index],
+      })),
+    },
+    { headers: { Authorization: `Bearer ${localStorage.getItem("token")}` } }
+  );
+
+  await Promise.all(
+    data.uploads.map((upload, index) =>
+      upload.duplicate
+        ? null
+        : axios.put(upload.url, files[index], { headers: upload.headers })
+    )
+  );
+
+  return data.uploads.map((upload) => upload.key);
+};
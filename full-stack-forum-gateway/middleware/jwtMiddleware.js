@@ -27,7 +27,8 @@ const jwtMiddleware = (req, res, next) => {
         id: decoded.user_id,
         role: decoded.role,
         verified: decoded.verified,
-        active: decoded.active
+        active: decoded.active,
+        tokenId: decoded.jti
       }
 
       console.log(
@@ -70,6 +70,9 @@ Object.entries(services).forEach(([route, target]) => {
             `[Proxy] Forwarding ${req.method} ${req.originalUrl} -> ${target}${req.path}`
           )
 
+          // Only services hold the internal token, a client sending one is forging it
+          proxyReq.removeHeader('X-Internal-Token')
+
           // Forward Authorization Header
           if (req.headers['authorization']) {
             proxyReq.setHeader('Authorization', req.headers['authorization'])
@@ -84,6 +87,12 @@ Object.entries(services).forEach(([route, target]) => {
               'X-User-Verified',
               req.user.verified ? 'true' : 'false'
             )
+            // Services check the token id against their revocation mirror
+            if (req.user.tokenId) {
+              proxyReq.setHeader('X-Token-ID', req.user.tokenId)
+            } else {
+              proxyReq.removeHeader('X-Token-ID')
+            }
 
             console.log(
               `📝 Injecting user info -> ID: ${req.user.id}, Role: ${
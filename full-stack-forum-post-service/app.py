@@ -4,12 +4,18 @@ from models import db
 from dotenv import load_dotenv
 from flask_cors import CORS
 from controllers.post_blueprint import post_bp
+from services import make_reply_event_handler, reconcile_reply_counts
+from shared.events import REPLY_EVENTS, subscribe
+from shared.auth import register_endpoint_metrics
+from shared.http_client import register_upstream_metrics
 import os
 
 load_dotenv()
 app = Flask(__name__)
 app.register_blueprint(post_bp, url_prefix='/posts')
 CORS(app, resources={r"/*": {"origins": "*"}})
+register_upstream_metrics(app)
+register_endpoint_metrics(app)
 
 # Configure MySQL database connection
 DB_USER = os.getenv("DATABASE_USER")
@@ -29,5 +35,14 @@ with app.app_context():
     db.create_all()
     print("---User table created successfully!---")
 
+# Keep Post.replyCount in step with reply creation and soft deletion
+subscribe(REPLY_EVENTS, make_reply_event_handler(app))
+
+@app.cli.command("reconcile-reply-counts")
+def reconcile_reply_counts_command():
+    """Recount active replies for every post and repair replyCount drift."""
+    fixed = reconcile_reply_counts()
+    print(f"---Reconciled reply counts, {fixed} posts fixed---")
+
 if __name__ == '__main__':
     app.run(port=5002, debug=True)
\ No newline at end of file
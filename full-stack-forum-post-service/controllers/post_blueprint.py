@@ -1,15 +1,41 @@
-import requests
+import os
+import sys
+from datetime import datetime
 from flask import Blueprint, request, jsonify
+from sqlalchemy import tuple_
 from models import db
 from models.post import Post, PostStatus
 from werkzeug.utils import secure_filename
-from decorator import authenticate_user
 
-post_bp = Blueprint("post_bp", __name__)
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from shared.auth import ADMIN_ROLES, authenticate_user
+from shared.derivatives import srcsets_for
+from shared.discovery import internal_headers, service_url
+from shared.events import POST_EVENTS, publish_event
+from shared.exceptions import ValidationError
+from shared.http_client import http
+from shared.pagination import decode_cursor, encode_cursor, get_page_size, paginate
+from shared.search import boolean_query, parse_terms
+from services import compose_feed, get_cached_post, invalidate_post, search_posts
 
-FILE_SERVICE_GET = "http://127.0.0.1:5009/files/upload"
+post_bp = Blueprint("post_bp", __name__)
 
-def format_post(post):
+FILE_SERVICE_GET = f"{service_url('file')}/files/upload/stream"  # piped to S3 as it arrives, not spooled first
+FILE_SERVICE_COMPLETE = f"{service_url('file')}/files/complete"
+UPLOAD_TIMEOUT = (3.05, 60)  # uploads stream file bodies, allow a longer read
+
+def image_urls(post):
+    return [url for url in (post.images or "").split(",") if url]
+
+def format_post(post, srcsets=None):
+    """
+    `srcsets` maps image URLs to their resized/WebP variants ({"webp": srcset, "default": srcset});
+    without it they are looked up for this post. Images whose variants are not built yet are left out
+    of "imageSrcset" and served at their original size.
+    """
+    images = image_urls(post)
+    if srcsets is None:
+        srcsets = srcsets_for(images)
     return {
     "post": {
         "id": post.postId,
@@ -20,10 +46,17 @@ def format_post(post):
         "isArchived": post.isArchived,
         "dateCreated": post.dateCreated.strftime("%Y/%m/%d %H:%M:%S") if post.dateCreated else None,  # update the date format
         "images": post.images,
-        "attachments": post.attachments
+        "imageSrcset": {url: srcsets[url] for url in images if url in srcsets},
+        "attachments": post.attachments,
+        "replyCount": post.replyCount
     }
 }
 
+def format_posts(posts):
+    """format_post for a page of posts, with the variants of all their images fetched at once."""
+    srcsets = srcsets_for(url for post in posts for url in image_urls(post))
+    return [format_post(post, srcsets) for post in posts]
+
 def upload_files_to_service(files):
     """Upload multiple files to the file service and return their URLs."""
     if not files:
@@ -31,9 +64,8 @@ def upload_files_to_service(files):
 
     uploaded_file_urls = []
 
-    # Get the Authorization header
-    auth_header = request.headers.get("Authorization")
-    headers = {"Authorization": auth_header} if auth_header else {}
+    # Direct call to the file service, authenticated as an internal request
+    headers = internal_headers()
 
     # Prepare files data for multipart upload
     files_data = [("file", (secure_filename(file.filename), file.stream, file.mimetype)) for file in files if file.filename]
@@ -43,7 +75,7 @@ def upload_files_to_service(files):
         return None
 
     # Send POST request to file service
-    response = requests.post(FILE_SERVICE_GET, files=files_data, headers=headers)
+    response = http.post(FILE_SERVICE_GET, files=files_data, headers=headers, timeout=UPLOAD_TIMEOUT)
 
     # Print API response for debugging
     print(f"Upload Response: {response.status_code}, {response.text}")
@@ -62,13 +94,37 @@ def upload_files_to_service(files):
 
     return ",".join(uploaded_file_urls) if uploaded_file_urls else None  # Return URLs as a single string
 
-@post_bp.route("/", methods=["GET"], strict_slashes=False)
-@authenticate_user()
-def get_all_posts(user_id, user_role, user_verified):
+def form_keys(name):
+    """Object keys sent in a form field, either repeated or comma-separated."""
+    return [key.strip() for value in request.form.getlist(name) for key in value.split(",") if key.strip()]
+
+def complete_uploads(keys):
+    """
+    Resolve keys of files the caller uploaded with presigned URLs (POST /files/presign) into their URLs.
+    The file service checks that each key was issued to the caller and exists. Completion takes a
+    reference on each file, so it is not retried.
+    """
+    if not keys:
+        return None
+
+    response = http.post(FILE_SERVICE_COMPLETE, json={"keys": keys}, headers=internal_headers())
+    if response.status_code in (400, 403):
+        raise ValidationError(response.json().get("error", "Invalid upload keys"))
+    if response.status_code != 200:
+        raise Exception(f"File upload completion failed: {response.text}")
+
+    return ",".join(file["file_url"] for file in response.json()["files"])
+
+def join_urls(*url_lists):
+    urls = [url for url_list in url_lists if url_list for url in url_list.split(",")]
+    return ",".join(urls) if urls else None
+
+def visible_posts_query(user_id, user_role, user_verified):
+    """Build the query for every post the caller is allowed to see in the feed."""
     # Base query for posts
     query = Post.query
 
-    if user_role and user_role.lower() in ["admin", "super_admin"]:
+    if user_role in ADMIN_ROLES:
         # Admins and super admins can see:
         # - All published, banned, and deleted posts
         # - Their own unpublished and hidden posts
@@ -99,10 +155,90 @@ def get_all_posts(user_id, user_role, user_verified):
             # Unverified users can only see published posts
             query = query.filter(Post.status == PostStatus.PUBLISHED.value)
 
-    # Sort posts by dateCreated (most recent first)
-    posts = query.order_by(Post.dateCreated.desc()).all()
+    return query
+
+def feed_page(user_id, user_role, user_verified, args):
+    """
+    One page of the posts the caller may see, most recent first, keyset paginated on (dateCreated, postId).
+    Returns (posts, next_cursor); raises ValidationError for a bad cursor or page size.
+    """
+    query = visible_posts_query(user_id, user_role, user_verified)
+    page_size = get_page_size(args)
+    cursor = args.get("cursor")
+    if cursor:
+        last_created, last_id = decode_cursor(cursor, (datetime, int))
+        query = query.filter(tuple_(Post.dateCreated, Post.postId) < (last_created, last_id))
+
+    query = query.order_by(Post.dateCreated.desc(), Post.postId.desc())
+    return paginate(query, page_size, lambda post: (post.dateCreated, post.postId))
+
+@post_bp.route("/", methods=["GET"], strict_slashes=False)
+@authenticate_user()
+def get_all_posts(user_id, user_role, user_verified):
+    try:
+        posts, next_cursor = feed_page(user_id, user_role, user_verified, request.args)
+    except ValidationError as e:
+        return jsonify({"error": e.message}), 400
+
+    return jsonify({
+        "posts": format_posts(posts),
+        "nextCursor": next_cursor
+    }), 200
 
-    return jsonify(list(map(format_post, posts))), 200
+@post_bp.route("/feed", methods=["GET"])
+@authenticate_user()
+def get_feed(user_id, user_role, user_verified):
+    """
+    The same page as GET /posts with each post's author and live reply count in one payload. An
+    upstream that fails or misses the time budget is named in "degraded": its authors are null,
+    its reply counts fall back to the post's stored replyCount.
+    """
+    try:
+        posts, next_cursor = feed_page(user_id, user_role, user_verified, request.args)
+    except ValidationError as e:
+        return jsonify({"error": e.message}), 400
+
+    feed, degraded = compose_feed(format_posts(posts))
+    return jsonify({
+        "feed": feed,
+        "nextCursor": next_cursor,
+        "degraded": degraded
+    }), 200
+
+MAX_QUERY_LENGTH = 200
+@post_bp.route("/search", methods=["GET"])
+@authenticate_user()
+def search(user_id, user_role, user_verified):
+    """
+    Ranked full-text search over post titles, content and active replies, limited to the posts
+    the caller may see in the feed. Matches are highlighted with <mark> in HTML-escaped excerpts.
+    """
+    query_text = request.args.get("q", "").strip()
+    if not query_text or len(query_text) > MAX_QUERY_LENGTH:
+        return jsonify({"error": f"Invalid request, 'q' of 1 to {MAX_QUERY_LENGTH} characters required"}), 400
+
+    terms = parse_terms(query_text)
+    if not terms:
+        return jsonify({"results": [], "nextCursor": None}), 200
+
+    # The cursor is the offset into the ranked results
+    try:
+        page_size = get_page_size(request.args)
+        cursor = request.args.get("cursor")
+        offset = max(0, decode_cursor(cursor, (int,))[0]) if cursor else 0
+    except ValidationError as e:
+        return jsonify({"error": e.message}), 400
+
+    results, has_more = search_posts(visible_posts_query(user_id, user_role, user_verified),
+                                     terms, boolean_query(terms), offset, page_size)
+    formatted = format_posts([post for post, _, _ in results])
+    return jsonify({
+        "results": [
+            {**formatted_post, "score": score, "highlights": highlights}
+            for formatted_post, (post, score, highlights) in zip(formatted, results)
+        ],
+        "nextCursor": encode_cursor(offset + page_size) if has_more else None
+    }), 200
 
 @post_bp.route("/", methods=["OPTIONS", "POST"], strict_slashes=False)
 @authenticate_user(require_verified=True)
@@ -116,13 +252,16 @@ def create_draft_post(user_id, user_role, user_verified):
         if "title" not in request.form or "content" not in request.form:
             return jsonify({"error": "Missing required fields"}), 400
         
-        # Upload files 
-        images_urls = upload_files_to_service(request.files.getlist("images")) if "images" in request.files else None
+        # Files uploaded directly to storage arrive as object keys
+        images_urls = complete_uploads(form_keys("imageKeys"))
+        attachments_urls = complete_uploads(form_keys("attachmentKeys"))
+
+        # Upload files sent in the request itself
+        if "images" in request.files:
+            images_urls = join_urls(images_urls, upload_files_to_service(request.files.getlist("images")))
         if any(key.startswith("attachments[") for key in request.files):
             attachments = [file for key, file in request.files.items() if key.startswith("attachments[")]
-            attachments_urls = upload_files_to_service(attachments)
-        else:
-            attachments_urls = None
+            attachments_urls = join_urls(attachments_urls, upload_files_to_service(attachments))
 
         # Create a new post
         new_post = Post(
@@ -144,6 +283,9 @@ def create_draft_post(user_id, user_role, user_verified):
             "post": format_post(new_post)
         }), 201
 
+    except ValidationError as e:
+        db.session.rollback()
+        return jsonify({"error": e.message}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": f"Post creation failed: {str(e)}"}), 500
@@ -162,7 +304,7 @@ def set_post_status(post_id, user_id, user_role, user_verified):
             return jsonify({"error": "Post not found"}), 404
 
         # Check if the user is authorized to change the status
-        if post.userId != user_id and user_role not in ["admin", "super_admin"]:
+        if post.userId != user_id and user_role not in ADMIN_ROLES:
             return jsonify({"error": "Unauthorized to change status"}), 403
 
         # Validate status transitions
@@ -182,14 +324,16 @@ def set_post_status(post_id, user_id, user_role, user_verified):
             return jsonify({"error": f"Invalid status transition: {current_status} -> {new_status}"}), 400
 
         # Additional checks for banned posts
-        if current_status == "Banned" and user_role not in ["admin", "super_admin"]:
+        if current_status == "Banned" and user_role not in ADMIN_ROLES:
             return jsonify({"error": "Only admins can unban posts"}), 403
-        if new_status == "Banned" and user_role not in ["admin", "super_admin"]:
+        if new_status == "Banned" and user_role not in ADMIN_ROLES:
             return jsonify({"error": "Only admins can ban posts"}), 403
 
         # Update the post status
         post.status = new_status
         db.session.commit()
+        invalidate_post(post.postId)
+        publish_event(POST_EVENTS, "post_status_changed", postId=post.postId, status=new_status)
 
         return jsonify({
             "message": f"Post status updated to {post.status}",
@@ -219,6 +363,8 @@ def toggle_post_archive(post_id, user_id, user_role, user_verified):
 
         post.isArchived = not post.isArchived
         db.session.commit()
+        invalidate_post(post.postId)
+        publish_event(POST_EVENTS, "post_archive_toggled", postId=post.postId, isArchived=post.isArchived)
 
         return jsonify({
             "message": f"Post archived set to {post.isArchived}",
@@ -228,37 +374,75 @@ def toggle_post_archive(post_id, user_id, user_role, user_verified):
         db.session.rollback()
         return jsonify({"error": f"Post status update failed: {str(e)}"}), 500
 
+def can_view_status(status, owner_id, user_id, user_role):
+    """Per-post visibility rules shared by get_post and get_posts_batch."""
+    if status == PostStatus.PUBLISHED:
+        # Published posts are visible to everyone (verified and unverified)
+        return True
+
+    elif status in [PostStatus.UNPUBLISHED, PostStatus.HIDDEN]:
+        # Unpublished/Hidden posts are only visible to the post owner
+        return owner_id == user_id
+
+    elif status in [PostStatus.BANNED, PostStatus.DELETED]:
+        # Banned/Deleted posts are visible to the post owner and admins
+        return owner_id == user_id or user_role in ADMIN_ROLES
+
+    return False
+
+def can_view_post(post, user_id, user_role):
+    return can_view_status(post.status, post.userId, user_id, user_role)
+
 @post_bp.route("/<int:post_id>", methods=["GET"], strict_slashes=False)
 @authenticate_user()
 def get_post(post_id, user_id, user_role, user_verified):
-    post = Post.query.get(post_id)
+    def load_post():
+        post = Post.query.get(post_id)
+        # Image variants are looked up below, they may be built after the post is cached
+        return format_post(post, srcsets={})["post"] if post else None
+
+    # Served from the Redis read-through cache, visibility is checked per viewer below
+    post = get_cached_post(post_id, load_post)
     if not post:
         return jsonify({"error": "Post not found"}), 404
-    print(post.status)
+    post["imageSrcset"] = srcsets_for((post["images"] or "").split(","))
+
+    try:
+        status = PostStatus(post["status"])
+    except ValueError:
+        # Handle unexpected post status
+        return jsonify({"error": "Invalid post status"}), 400
+
     # Check post visibility based on status
-    if post.status == PostStatus.PUBLISHED:
-        # Published posts are visible to everyone (verified and unverified)
-        return jsonify(format_post(post)), 200
+    if not can_view_status(status, post["userId"], user_id, user_role):
+        return jsonify({"error": "Unauthorized to view this post"}), 403
 
-    elif post.status in [PostStatus.UNPUBLISHED, PostStatus.HIDDEN]:
-        # Unpublished/Hidden posts are only visible to the post owner
-        if post.userId == user_id:
-            return jsonify(format_post(post)), 200
-        else:
-            return jsonify({"error": "Unauthorized to view this post"}), 403
+    return jsonify({"post": post}), 200
 
-    elif post.status in [PostStatus.BANNED, PostStatus.DELETED]:
-        # Banned/Deleted posts are visible to the post owner and admins
-        if post.userId == user_id or user_role in ["admin", "super_admin"]:
-            return jsonify(format_post(post)), 200
-        else:
-            return jsonify({"error": "Unauthorized to view this post"}), 403
+# look up many posts at once, keyed by post id
+MAX_BATCH_POSTS = 200
+@post_bp.route("/batch", methods=["POST"])
+@authenticate_user()
+def get_posts_batch(user_id, user_role, user_verified):
+    data = request.get_json(silent=True)
+    post_ids = data.get("postIds") if data else None
 
-    else:
-        # Handle unexpected post status
-        return jsonify({"error": "Invalid post status"}), 400
+    if not isinstance(post_ids, list) or not post_ids:
+        return jsonify({"error": "Invalid request, non-empty 'postIds' list required"}), 400
+    if len(post_ids) > MAX_BATCH_POSTS:
+        return jsonify({"error": f"Too many postIds, at most {MAX_BATCH_POSTS} per request"}), 400
+
+    try:
+        post_ids = {int(post_id) for post_id in post_ids}
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid request, postIds must be integers"}), 400
+
+    # Missing posts and posts the caller may not see are left out of the map
+    posts = [post for post in Post.query.filter(Post.postId.in_(post_ids)).all() if can_view_post(post, user_id, user_role)]
+    return jsonify({
+        "posts": {str(post.postId): formatted for post, formatted in zip(posts, format_posts(posts))}
+    }), 200
 
-from datetime import datetime
 @post_bp.route("/<int:post_id>", methods=["PUT"])
 @authenticate_user(require_verified=True)
 def edit_post(post_id, user_id, user_role, user_verified):
@@ -286,8 +470,11 @@ def edit_post(post_id, user_id, user_role, user_verified):
         existing_images = request.form.get("images", "")
         existing_images_list = existing_images.split(",") if existing_images else []
 
-        # handle updated images
-        new_images_urls = upload_files_to_service(request.files.getlist("newImages")) if "newImages" in request.files else None
+        # handle updated images, uploaded directly to storage or sent in the request
+        new_images_urls = join_urls(
+            complete_uploads(form_keys("newImageKeys")),
+            upload_files_to_service(request.files.getlist("newImages")) if "newImages" in request.files else None
+        )
         new_images_list = new_images_urls.split(",") if new_images_urls else []
 
         final_images = existing_images_list + new_images_list
@@ -298,7 +485,10 @@ def edit_post(post_id, user_id, user_role, user_verified):
         existing_attachments_list = existing_attachments.split(",") if existing_attachments else []
 
         # Handle new attachments uploaded
-        new_attachments_urls = upload_files_to_service(request.files.getlist("newAttachments")) if "newAttachments" in request.files else None
+        new_attachments_urls = join_urls(
+            complete_uploads(form_keys("newAttachmentKeys")),
+            upload_files_to_service(request.files.getlist("newAttachments")) if "newAttachments" in request.files else None
+        )
         new_attachments_list = new_attachments_urls.split(",") if new_attachments_urls else []
 
         # Merge existing and new attachments correctly
@@ -306,47 +496,50 @@ def edit_post(post_id, user_id, user_role, user_verified):
         post.attachments = ",".join(final_attachments) if final_attachments else None
 
         db.session.commit()
+        invalidate_post(post.postId)
+        publish_event(POST_EVENTS, "post_updated", postId=post.postId)
 
         return jsonify({
             "message": "Post updated successfully!",
             "post": format_post(post)
         }), 200
     
+    except ValidationError as e:
+        db.session.rollback()
+        return jsonify({"error": e.message}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": f"Post update failed: {str(e)}"}), 500
 
 # get 3 top posts from user
-REPLY_SERVICE_URL = "http://127.0.0.1:5009/replies/reply-count"
-@post_bp.route("/<int:user_id>/top-posts", methods=["GET"])
+TOP_POSTS_LIMIT = 3
+# The route parameter is author_id: authenticate_user leaves a route user_id alone, it must not stand in for the caller
+@post_bp.route("/<int:author_id>/top-posts", methods=["GET"])
 @authenticate_user()
-def get_user_top_posts(user_id, user_role, user_verified):
-    posts = Post.query.filter_by(userId=user_id, isArchived=False).all()
-    if not posts:
-        return jsonify({"posts": []}), 200
-    post_ids = [post.postId for post in posts]
-    # use reply service to get the reply count
-    try:
-        reply_response = requests.post(REPLY_SERVICE_URL, json={"postIds": post_ids})
-        reply_counts = reply_response.json().get("replyCounts", {})
-    except Exception as e:
-        return jsonify({"error": f"Failed to fetch reply counts: {str(e)}"}), 500
-    posts_with_replies = [
-        (post, reply_counts.get(str(post.postId), 0))  # default set to 0
-        for post in posts
-    ]
-    posts_with_replies.sort(key=lambda x: x[1], reverse=True)
-    top_posts = posts_with_replies[:3]
-    return jsonify({"posts": [format_post(post) for post, _ in top_posts]}), 200
+def get_user_top_posts(author_id, user_id, user_role, user_verified):
+    # replyCount is maintained from reply events, so this is a single indexed query.
+    # Only the author's posts the caller may see in the feed are ranked
+    top_posts = (
+        visible_posts_query(user_id, user_role, user_verified)
+        .filter(Post.userId == author_id, Post.isArchived == False)
+        .order_by(Post.replyCount.desc(), Post.postId.desc())
+        .limit(TOP_POSTS_LIMIT)
+        .all()
+    )
+    return jsonify({"posts": format_posts(top_posts)}), 200
 
 # get drafts from users
-@post_bp.route("/<int:user_id>/drafts", methods=["GET"])
+@post_bp.route("/<int:author_id>/drafts", methods=["GET"])
 @authenticate_user()
-def get_user_drafts(user_id, user_role, user_verified):
+def get_user_drafts(author_id, user_id, user_role, user_verified):
+    # Drafts are private to their author
+    if author_id != user_id and user_role not in ADMIN_ROLES:
+        return jsonify({"error": "Forbidden: You can only view your own drafts"}), 403
+
     drafts = (
         Post.query
-        .filter_by(userId=user_id, status=PostStatus.UNPUBLISHED.value)  # get unpublished post
+        .filter_by(userId=author_id, status=PostStatus.UNPUBLISHED.value)  # get unpublished post
         .order_by(Post.dateCreated.desc())  # order by creating time
         .all()
     )
-    return jsonify({"drafts": list(map(format_post, drafts))}), 200
\ No newline at end of file
+    return jsonify({"drafts": format_posts(drafts)}), 200
\ No newline at end of file
@@ -26,6 +26,20 @@ class Post(db.Model):
     dateModified = db.Column(db.DateTime, default=datetime.now(), onupdate=datetime.now())
     images = db.Column(db.Text, nullable=True)
     attachments = db.Column(db.Text, nullable=True)
+    # Active replies, kept up to date from reply service events and repaired by `flask reconcile-reply-counts`
+    replyCount = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        # Feed: status filters + newest-first keyset order on (dateCreated, postId)
+        db.Index("ix_post_created", "dateCreated", "postId"),
+        db.Index("ix_post_status_created", "status", "dateCreated", "postId"),
+        # Per-user lookups: drafts and the owner-only branches of the feed
+        db.Index("ix_post_user_status_created", "userId", "status", "dateCreated"),
+        # Top posts: a user's non-archived posts by reply count
+        db.Index("ix_post_user_archived_replies", "userId", "isArchived", "replyCount"),
+        # GET /posts/search: MATCH(title, content) AGAINST (...)
+        db.Index("ft_post_title_content", "title", "content", mysql_prefix="FULLTEXT"),
+    )
 
     def __repr__(self):
         return f'<Post {self.title}>'
\ No newline at end of file
@@ -0,0 +1,6 @@
+from .feed import compose_feed
+from .post_cache import get_cached_post, invalidate_post
+from .reply_counter import make_reply_event_handler, reconcile_reply_counts
+from .search import search_posts
+
+__all__ = ["compose_feed", "get_cached_post", "invalidate_post", "make_reply_event_handler", "reconcile_reply_counts", "search_posts"]
@@ -0,0 +1,80 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import requests
+from shared.discovery import internal_headers, service_url
+from shared.http_client import http
+
+# Total time the feed waits on the user and reply services together; sources still out after it are skipped
+FEED_TIMEOUT = float(os.getenv("FEED_TIMEOUT", "0.8"))  # seconds
+FEED_WORKERS = int(os.getenv("FEED_WORKERS", "16"))
+# Fields of a user profile shown next to a post; email and the rest stay in the user service
+AUTHOR_FIELDS = ("id", "firstName", "lastName", "profileImageURL", "profileImageSrcset")
+
+# Shared by all requests, so upstream fan-out is capped per process rather than per feed
+feed_executor = ThreadPoolExecutor(max_workers=FEED_WORKERS, thread_name_prefix="feed")
+
+def fetch_authors(user_ids, headers, timeout):
+    """{userId: public profile fields} of the authors that exist, in one batch lookup."""
+    if not user_ids:
+        return {}
+    response = http.post(f"{service_url('user')}/users/batch", json={"userIds": user_ids},
+                         headers=headers, timeout=timeout, retries=0)
+    response.raise_for_status()
+    return {
+        int(user_id): {field: user.get(field) for field in AUTHOR_FIELDS}
+        for user_id, user in response.json().get("users", {}).items()
+    }
+
+def fetch_reply_counts(post_ids, timeout):
+    """{postId: active reply count} from the reply service's counters."""
+    response = http.post(f"{service_url('reply')}/replies/reply-count", json={"postIds": post_ids},
+                         headers=internal_headers(forward_identity=False), timeout=timeout, retries=0)
+    response.raise_for_status()
+    return {int(post_id): count for post_id, count in response.json().get("replyCounts", {}).items()}
+
+def compose_feed(formatted_posts, timeout=FEED_TIMEOUT):
+    """
+    Add authors and live reply counts to a page of formatted posts, fetching the authors and the
+    counts concurrently, one batch call each, so the page costs the slowest upstream rather than
+    their sum.
+    Whatever is not back within `timeout` is left out: authors become None and reply counts stay
+    the post's stored replyCount. Returns (feed, degraded), degraded listing the sources skipped.
+    Must run inside a request context, the caller's identity is forwarded to the user service.
+    """
+    posts = [formatted["post"] for formatted in formatted_posts]
+    if not posts:
+        return [], []
+    # Worker threads have no request context, so the identity headers are resolved here
+    headers = internal_headers()
+    request_timeout = (min(1.0, timeout), timeout)
+
+    author_ids = list(dict.fromkeys(post["userId"] for post in posts if post["userId"]))
+    authors = feed_executor.submit(fetch_authors, author_ids, headers, request_timeout)
+    counts = feed_executor.submit(fetch_reply_counts, [post["id"] for post in posts], request_timeout)
+    wait([authors, counts], timeout=timeout)
+
+    # result(timeout=0) raises FutureTimeoutError for a source still out past the budget
+    degraded = []
+    author_of = {}
+    try:
+        author_of = authors.result(timeout=0)
+    except (requests.exceptions.RequestException, ValueError, FutureTimeoutError) as e:
+        print(f"❌ Feed authors unavailable: {e!r}")
+        degraded.append("authors")
+
+    reply_counts = {}
+    try:
+        reply_counts = counts.result(timeout=0)
+    except (requests.exceptions.RequestException, ValueError, FutureTimeoutError) as e:
+        print(f"❌ Feed reply counts unavailable, using stored counts: {e!r}")
+        degraded.append("replyCounts")
+
+    feed = [
+        {
+            "post": {**post, "replyCount": reply_counts.get(post["id"], post["replyCount"])},
+            "author": author_of.get(post["userId"]),
+        }
+        for post in posts
+    ]
+    return feed, degraded
@@ -0,0 +1,79 @@
+import json
+import os
+import random
+import time
+import uuid
+import redis
+from shared.redis_client import get_redis
+
+POST_CACHE_TTL = int(os.getenv("POST_CACHE_TTL", "60"))
+NOT_FOUND_TTL = 5
+LOCK_TTL_MS = 5000
+LOCK_WAIT_SECONDS = 1.0
+LOCK_POLL_SECONDS = 0.05
+NOT_FOUND = "__not_found__"
+
+# Delete the refill lock only if we still own it
+_RELEASE_LOCK = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+def _key(post_id):
+    return f"post:{post_id}"
+
+def _store(client, post_id, post):
+    if post is None:
+        client.setex(_key(post_id), NOT_FOUND_TTL, NOT_FOUND)
+    else:
+        # Jitter the TTL so posts cached together do not all expire together
+        ttl = POST_CACHE_TTL + random.randint(0, max(1, POST_CACHE_TTL // 10))
+        client.setex(_key(post_id), ttl, json.dumps(post))
+
+def _decode(cached):
+    return None if cached == NOT_FOUND else json.loads(cached)
+
+def get_cached_post(post_id, loader):
+    """
+    Read-through cache of serialized posts. `loader()` returns the serialized post, or None if it
+    does not exist, and runs at most once per expiry across all workers: the first miss takes a
+    short Redis lock and refills, concurrent misses wait for the refill instead of hitting MySQL.
+    Visibility is checked by the caller on the returned post, so one entry serves every viewer.
+    Falls back to `loader()` if Redis is unavailable.
+    """
+    try:
+        client = get_redis()
+        cached = client.get(_key(post_id))
+        if cached is not None:
+            return _decode(cached)
+
+        lock_key = f"lock:{_key(post_id)}"
+        token = uuid.uuid4().hex
+        if client.set(lock_key, token, nx=True, px=LOCK_TTL_MS):
+            try:
+                post = loader()
+                _store(client, post_id, post)
+                return post
+            finally:
+                client.eval(_RELEASE_LOCK, 1, lock_key, token)
+
+        # Someone else is refilling, wait for their result
+        deadline = time.monotonic() + LOCK_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL_SECONDS)
+            cached = client.get(_key(post_id))
+            if cached is not None:
+                return _decode(cached)
+    except redis.exceptions.RedisError as e:
+        print(f"❌ Post cache unavailable, reading post {post_id} from the database: {e}")
+
+    return loader()
+
+def invalidate_post(post_id):
+    """Drop a cached post after it changes. The next read refills it."""
+    try:
+        get_redis().delete(_key(post_id))
+    except redis.exceptions.RedisError as e:
+        print(f"❌ Failed to invalidate cached post {post_id}: {e}")
@@ -0,0 +1,92 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import update
+from models import db
+from models.post import Post
+from services.post_cache import invalidate_post
+from shared.discovery import internal_headers, service_url
+from shared.http_client import http
+from shared.redis_client import get_redis
+
+# How much an event moves the post's replyCount
+REPLY_EVENT_DELTAS = {"reply_created": 1, "reply_deleted": -1}
+RECONCILE_BATCH_SIZE = 500
+# post:reply-event:<type>:<replyId>, set by the one process that applies the event
+APPLIED_EVENT_PREFIX = "post:reply-event:"
+APPLIED_EVENT_TTL = int(os.getenv("REPLY_EVENT_DEDUP_TTL", "604800"))  # seconds
+
+# One worker, so events are applied in the order they arrive and the subscriber thread only hands them over
+reply_event_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reply-events")
+
+def fetch_reply_counts(post_ids, fresh=False):
+    """{postId: active reply count} from the reply service; fresh recounts in its database."""
+    response = http.post(f"{service_url('reply')}/replies/reply-count", json={"postIds": post_ids, "fresh": fresh},
+                         headers=internal_headers(forward_identity=False), retry=True)
+    response.raise_for_status()
+    return {int(post_id): count for post_id, count in response.json().get("replyCounts", {}).items()}
+
+def _claim_event(event_type, reply_id):
+    """True for the first process to see this event, False for every redelivery."""
+    key = f"{APPLIED_EVENT_PREFIX}{event_type}:{reply_id}"
+    return bool(get_redis().set(key, 1, nx=True, ex=APPLIED_EVENT_TTL))
+
+def apply_reply_event(app, event_type, post_id, reply_id):
+    delta = REPLY_EVENT_DELTAS[event_type]
+    try:
+        if not _claim_event(event_type, reply_id):
+            return
+        with app.app_context():
+            db.session.execute(update(Post).where(Post.postId == post_id).values(replyCount=Post.replyCount + delta))
+            db.session.commit()
+        invalidate_post(post_id)
+    except Exception as e:
+        # Left for `flask reconcile-reply-counts` to repair
+        print(f"❌ Could not apply {event_type} of reply {reply_id} to post {post_id}: {e}")
+
+def make_reply_event_handler(app):
+    """
+    Handler for reply service events: add 1 to Post.replyCount per created reply and subtract 1
+    per deleted one. Pub/sub delivers every event to every subscribed process (and to the reloader
+    parent under debug), so each (type, replyId) is claimed with SET NX and applied exactly once.
+    The database work runs on reply_event_executor, off the subscriber thread.
+    """
+    def handle(event):
+        if event.get("type") not in REPLY_EVENT_DELTAS or "postId" not in event or "replyId" not in event:
+            return
+        reply_event_executor.submit(apply_reply_event, app, event["type"], int(event["postId"]), int(event["replyId"]))
+    return handle
+
+def reconcile_reply_counts(batch_size=RECONCILE_BATCH_SIZE):
+    """
+    Repair replyCount drift (e.g. from events lost while Redis was down) by recounting active
+    replies in the reply service's database, which also resets its reply counters, batch_size
+    posts at a time. Returns the number of posts fixed.
+    Must run inside an app context.
+    """
+    fixed = 0
+    last_id = 0
+    while True:
+        batch = (
+            db.session.query(Post.postId, Post.replyCount)
+            .filter(Post.postId > last_id)
+            .order_by(Post.postId)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            return fixed
+        last_id = batch[-1].postId
+
+        counts = fetch_reply_counts([row.postId for row in batch], fresh=True)
+
+        drifted = [
+            {"postId": row.postId, "replyCount": counts.get(row.postId, 0)}
+            for row in batch
+            if row.replyCount != counts.get(row.postId, 0)
+        ]
+        if drifted:
+            db.session.execute(update(Post), drifted)
+            db.session.commit()
+            for row in drifted:
+                invalidate_post(row["postId"])
+            fixed += len(drifted)
@@ -0,0 +1,67 @@
+import os
+import requests
+from sqlalchemy.dialects.mysql import match
+from models.post import Post
+from shared.discovery import internal_headers, service_url
+from shared.http_client import http
+from shared.search import highlight
+
+# Ranked candidates taken from each source; results beyond this depth are not paged to
+SEARCH_CANDIDATES = int(os.getenv("SEARCH_CANDIDATES", "200"))
+# A matching reply counts for less than the post's own text
+REPLY_MATCH_WEIGHT = float(os.getenv("REPLY_MATCH_WEIGHT", "0.5"))
+REPLY_SEARCH_TIMEOUT = (1, 2)  # a slow reply service only costs the reply matches
+
+def fetch_reply_hits(against):
+    """Best matching active reply per post from the reply service, by postId. Empty if it is unavailable."""
+    try:
+        response = http.post(f"{service_url('reply')}/replies/search",
+                             json={"query": against, "limit": SEARCH_CANDIDATES},
+                             headers=internal_headers(), timeout=REPLY_SEARCH_TIMEOUT, retry=True)
+        response.raise_for_status()
+        return {hit["postId"]: hit for hit in response.json().get("hits", [])}
+    except (requests.exceptions.RequestException, ValueError) as e:
+        print(f"❌ Reply search unavailable, returning post matches only: {e}")
+        return {}
+
+def search_posts(visible_query, terms, against, offset, page_size):
+    """
+    Rank the posts of `visible_query` matching `against` (IN BOOLEAN MODE) by their own FULLTEXT
+    score plus REPLY_MATCH_WEIGHT times the score of their best matching reply.
+    Returns (results, has_more) for the page starting at `offset`; each result is a
+    (post, score, highlights) tuple.
+    """
+    score = match(Post.title, Post.content, against=against).in_boolean_mode()
+    post_hits = (
+        visible_query
+        .add_columns(score.label("score"))
+        .filter(score)
+        .order_by(score.desc(), Post.postId.desc())
+        .limit(SEARCH_CANDIDATES)
+        .all()
+    )
+    ranked = {post.postId: [post, float(post_score)] for post, post_score in post_hits}
+
+    reply_hits = fetch_reply_hits(against)
+    reply_only = [post_id for post_id in reply_hits if post_id not in ranked]
+    if reply_only:
+        # Same visibility rules as the post matches
+        for post in visible_query.filter(Post.postId.in_(reply_only)).all():
+            ranked[post.postId] = [post, 0.0]
+    for post_id, hit in reply_hits.items():
+        if post_id in ranked:
+            ranked[post_id][1] += REPLY_MATCH_WEIGHT * hit["score"]
+
+    ordered = sorted(ranked.values(), key=lambda entry: (entry[1], entry[0].postId), reverse=True)
+    page = ordered[offset:offset + page_size]
+
+    results = []
+    for post, rank in page:
+        highlights = {
+            "title": highlight(post.title, terms),
+            "content": highlight(post.content, terms)
+        }
+        if post.postId in reply_hits:
+            highlights["reply"] = reply_hits[post.postId]["highlight"]
+        results.append((post, round(rank, 4), highlights))
+    return results, len(ordered) > offset + page_size
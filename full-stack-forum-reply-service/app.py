@@ -4,11 +4,14 @@ from models import db
 from dotenv import load_dotenv
 from flask_cors import CORS
 from controllers.reply_blueprint import reply_bp
+from services import backfill_reply_paths
+from shared.auth import register_endpoint_metrics
 import os
 
 load_dotenv()
 app = Flask(__name__)
 app.register_blueprint(reply_bp, url_prefix='/replies')
+register_endpoint_metrics(app)
 CORS(app, resources={r"/*": {"origins": "*"}})
 
 # Configure MySQL database connection
@@ -29,5 +32,11 @@ with app.app_context():
     db.create_all()
     print("---Reply table created successfully!---")
 
+@app.cli.command("backfill-reply-paths")
+def backfill_reply_paths_command():
+    """Thread replies created before materialized paths existed."""
+    updated = backfill_reply_paths()
+    print(f"---Backfilled reply paths, {updated} replies threaded---")
+
 if __name__ == '__main__':
     app.run(port=5003, debug=True)
\ No newline at end of file
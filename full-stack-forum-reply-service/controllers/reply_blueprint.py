@@ -1,10 +1,28 @@
+import os
+import sys
 from flask import Blueprint, request, jsonify
+from datetime import datetime
+from sqlalchemy import tuple_, update
+from sqlalchemy.dialects.mysql import match
 from models import db
 from models.reply import Reply
-from decorator import authenticate_user
+from services import (MAX_REPLY_DEPTH, adjust_reply_count, get_reply_counts, load_subtree, load_threads, nest,
+                      refresh_reply_counts, reply_summaries)
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from shared.auth import authenticate_user
+from shared.discovery import require_internal
+from shared.events import REPLY_EVENTS, publish_event
+from shared.exceptions import ValidationError
+from shared.pagination import decode_cursor, encode_cursor, get_page_size, paginate
+from shared.search import highlight, parse_terms
 
 reply_bp = Blueprint("reply_bp", __name__)
 
+DEFAULT_SUMMARY_REPLIES = 3
+MAX_SUMMARY_REPLIES = 10
+MAX_SUMMARY_POSTS = 100
+
 def format_reply(reply):
     return {
             "reply": {
@@ -13,21 +31,148 @@ def format_reply(reply):
                 "postId": reply.postId,
                 "comment": reply.comment,
                 "isActive": reply.isActive,
-                "dateCreated": str(reply.dateCreated),
+                "dateCreated": reply.dateCreated.strftime("%Y/%m/%d %H:%M:%S") if reply.dateCreated else None,  # same format as posts
+                "parentReplyId": reply.parent_reply_id,
             }
         }
 
+def format_thread_reply(reply):
+    node = format_reply(reply)
+    node["reply"]["depth"] = reply.depth
+    # Deleted replies stay in the tree to hold their children in place, without their text
+    if not reply.isActive:
+        node["reply"]["comment"] = None
+    return node
+
+def get_max_depth(args):
+    """The `maxDepth` query parameter: levels shown below the requested replies, clamped to [0, MAX_REPLY_DEPTH]."""
+    max_depth = args.get("maxDepth")
+    if max_depth is None or max_depth == "":
+        return MAX_REPLY_DEPTH
+    try:
+        return max(0, min(int(max_depth), MAX_REPLY_DEPTH))
+    except ValueError:
+        raise ValidationError("Invalid maxDepth, integer required")
+
+def is_true(value):
+    return str(value).lower() in ("1", "true", "yes")
+
 @reply_bp.route('/post/<int:post_id>', methods=['GET'])
 def get_replies(post_id):
+    """
+    A post's replies newest first, keyset paginated on (dateCreated, replyId). Soft-deleted replies
+    are left out unless activeOnly=false.
+    """
     if not post_id:
         return jsonify({"error": "Invalid request, post id required"}), 400
-    
-    replies = Reply.query.filter_by(postId=post_id).all()
-    
-    if not replies:
-        return jsonify({"message": "No replies found for this post"}), 200
 
-    return jsonify(list(map(format_reply, replies))), 200
+    query = Reply.query.filter(Reply.postId == post_id)
+    # Served by the (postId, isActive, dateCreated) index
+    if is_true(request.args.get("activeOnly", "true")):
+        query = query.filter(Reply.isActive == True)
+
+    try:
+        page_size = get_page_size(request.args)
+        cursor = request.args.get("cursor")
+        if cursor:
+            last_created, last_id = decode_cursor(cursor, (datetime, int))
+            query = query.filter(tuple_(Reply.dateCreated, Reply.replyId) < (last_created, last_id))
+    except ValidationError as e:
+        return jsonify({"error": e.message}), 400
+
+    query = query.order_by(Reply.dateCreated.desc(), Reply.replyId.desc())
+    replies, next_cursor = paginate(query, page_size, lambda reply: (reply.dateCreated, reply.replyId))
+
+    return jsonify({
+        "replies": list(map(format_reply, replies)),
+        "nextCursor": next_cursor
+    }), 200
+
+def summary_limit(value):
+    try:
+        return max(1, min(int(value), MAX_SUMMARY_REPLIES))
+    except (TypeError, ValueError):
+        raise ValidationError("Invalid limit, integer required")
+
+def format_summary(replies, total):
+    return {"replies": list(map(format_reply, replies)), "total": total}
+
+# newest replies and active reply count of a post, for feed cards
+@reply_bp.route('/post/<int:post_id>/summary', methods=['GET'])
+def get_reply_summary(post_id):
+    try:
+        limit = summary_limit(request.args.get("limit", DEFAULT_SUMMARY_REPLIES))
+    except ValidationError as e:
+        return jsonify({"error": e.message}), 400
+
+    replies, total = reply_summaries([post_id], limit)[post_id]
+    return jsonify(format_summary(replies, total)), 200
+
+# the same for a page of feed cards at once
+@reply_bp.route('/summary', methods=['POST'])
+def get_reply_summaries():
+    """
+    Takes {"postIds": [...], "limit": n} and returns {"summaries": {postId: {"replies", "total"}}}: the n
+    newest active replies of every post (one window-function query) and its active reply count.
+    """
+    data = request.get_json(silent=True) or {}
+    post_ids = data.get("postIds")
+    if not isinstance(post_ids, list) or not post_ids:
+        return jsonify({"error": "Invalid request, non-empty 'postIds' list required"}), 400
+    if len(post_ids) > MAX_SUMMARY_POSTS:
+        return jsonify({"error": f"Too many postIds, at most {MAX_SUMMARY_POSTS} per request"}), 400
+    try:
+        post_ids = list({int(post_id) for post_id in post_ids})
+        limit = summary_limit(data.get("limit", DEFAULT_SUMMARY_REPLIES))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid request, postIds must be integers"}), 400
+    except ValidationError as e:
+        return jsonify({"error": e.message}), 400
+
+    summaries = reply_summaries(post_ids, limit)
+    return jsonify({
+        "summaries": {str(post_id): format_summary(*summary) for post_id, summary in summaries.items()}
+    }), 200
+
+# get a post's replies as nested threads, paginated by top-level reply
+@reply_bp.route('/post/<int:post_id>/threads', methods=['GET'])
+def get_reply_threads(post_id):
+    """
+    Top-level replies oldest first, each with its replies nested under "children" down to maxDepth
+    levels. The whole page is loaded in one query on the materialized path and nested in one pass.
+    Nodes whose replies were cut off by maxDepth have "hasMoreReplies", GET /replies/<id>/thread
+    continues from them.
+    """
+    try:
+        page_size = get_page_size(request.args)
+        cursor = request.args.get("cursor")
+        after_id = decode_cursor(cursor, (int,))[0] if cursor else 0
+        max_depth = get_max_depth(request.args)
+    except ValidationError as e:
+        return jsonify({"error": e.message}), 400
+
+    replies, has_more = load_threads(post_id, after_id, page_size, max_depth)
+    threads = nest(replies, format_thread_reply, max_depth)
+    return jsonify({
+        "threads": threads,
+        "nextCursor": encode_cursor(threads[-1]["reply"]["replyId"]) if has_more else None
+    }), 200
+
+# get one reply with its replies nested below it
+@reply_bp.route('/<int:reply_id>/thread', methods=['GET'])
+def get_reply_subtree(reply_id):
+    try:
+        max_depth = get_max_depth(request.args)
+    except ValidationError as e:
+        return jsonify({"error": e.message}), 400
+
+    reply = Reply.query.get(reply_id)
+    if not reply:
+        return jsonify({"error": "Reply not found"}), 404
+    if reply.path is None:
+        return jsonify({"error": "Reply is not threaded yet"}), 409
+
+    return jsonify({"thread": nest(load_subtree(reply, max_depth), format_thread_reply, max_depth)[0]}), 200
 
 @reply_bp.route('/post/<int:post_id>', methods=['POST'])
 @authenticate_user()
@@ -39,16 +184,36 @@ def create_reply(post_id, user_id, user_role, user_verified):
 
     if not post_id:
         return jsonify({"error": "Invalid request, post id required"}), 400
-    
+
+    # Replying to a reply nests under it, in the same post
+    parent = None
+    if data.get("parentReplyId") is not None:
+        try:
+            parent = Reply.query.get(int(data["parentReplyId"]))
+        except (TypeError, ValueError):
+            return jsonify({"error": "Invalid parentReplyId, integer required"}), 400
+        if not parent or parent.postId != post_id:
+            return jsonify({"error": "Parent reply not found in this post"}), 404
+        if parent.path is None:
+            return jsonify({"error": "Parent reply is not threaded yet"}), 409
+        if parent.depth >= MAX_REPLY_DEPTH:
+            return jsonify({"error": f"Replies nest at most {MAX_REPLY_DEPTH} levels deep"}), 400
+
     try:
         new_reply = Reply(
             userId=user_id,
             postId=post_id,
             comment=data["comment"],
+            parent_reply_id=parent.replyId if parent else None,
         )
 
         db.session.add(new_reply)
+        # The path ends with the new replyId
+        db.session.flush()
+        new_reply.place_under(parent)
         db.session.commit()
+        adjust_reply_count(new_reply.postId, 1)
+        publish_event(REPLY_EVENTS, "reply_created", postId=new_reply.postId, replyId=new_reply.replyId)
         
         return jsonify({
             "message": "Reply Created",
@@ -100,9 +265,15 @@ def soft_delete_reply(reply_id, user_id, user_role, user_verified):
         return jsonify({"error": "Invalid request, unauthorized to change status"}), 400
 
     try:
-        reply.isActive = False
-
+        # Conditional update, so of concurrent deletes of the same reply exactly one sees rowcount 1
+        result = db.session.execute(
+            update(Reply).where(Reply.replyId == reply_id, Reply.isActive == True).values(isActive=False)
+        )
         db.session.commit()
+        # Only the delete that deactivated the reply changes the post's active reply count
+        if result.rowcount == 1:
+            adjust_reply_count(reply.postId, -1)
+            publish_event(REPLY_EVENTS, "reply_deleted", postId=reply.postId, replyId=reply.replyId)
 
         return jsonify({
             "message": "Reply soft deleted successfully!",
@@ -114,21 +285,81 @@ def soft_delete_reply(reply_id, user_id, user_role, user_verified):
         return jsonify({"error": f"Reply update failed: {str(e)}"}), 500
     
 # use post id to get the reply count
+MAX_COUNT_POSTS = 1000
 @reply_bp.route("/reply-count", methods=["POST"])
-def get_reply_counts():
-    data = request.get_json()
+@require_internal
+def get_post_reply_counts():
+    """
+    Reply counts of a batch of posts, {"postIds": [...]}. Active replies are counted by default, from
+    the Redis counters; "activeOnly": false counts soft-deleted replies too, in the database, and
+    "fresh": true recounts active replies in the database and resets their counters.
+    """
+    data = request.get_json(silent=True) or {}
     post_ids = data.get("postIds", [])
 
     if not post_ids:
         return jsonify({"error": "No postIds provided"}), 400
+    if not isinstance(post_ids, list) or len(post_ids) > MAX_COUNT_POSTS:
+        return jsonify({"error": f"postIds must be a list of at most {MAX_COUNT_POSTS} ids"}), 400
+    try:
+        post_ids = [int(post_id) for post_id in post_ids]
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid postIds, integers required"}), 400
+
+    if not data.get("activeOnly", True):
+        reply_counts = (
+            db.session.query(Reply.postId, db.func.count(Reply.replyId))
+            .filter(Reply.postId.in_(post_ids))
+            .group_by(Reply.postId)
+            .all()
+        )
+    elif data.get("fresh"):
+        reply_counts = refresh_reply_counts(post_ids).items()
+    else:
+        reply_counts = get_reply_counts(post_ids).items()
+
+    reply_count_dict = {str(post_id): count for post_id, count in reply_counts}
 
-    reply_counts = (
-        db.session.query(Reply.postId, db.func.count(Reply.replyId))
-        .filter(Reply.postId.in_(post_ids))
-        .group_by(Reply.postId)
+    return jsonify({"replyCounts": reply_count_dict}), 200
+
+# Full-text search over active replies, for the post service's GET /posts/search
+MAX_SEARCH_HITS = 500
+@reply_bp.route("/search", methods=["POST"])
+@require_internal
+def search_replies():
+    """
+    Takes {"query": <MATCH ... AGAINST string, IN BOOLEAN MODE>, "limit": n} and returns the best
+    matching active reply of each post, highest score first.
+    """
+    data = request.get_json(silent=True) or {}
+    against = data.get("query")
+    if not against or not isinstance(against, str):
+        return jsonify({"error": "Invalid request, query required"}), 400
+    try:
+        limit = min(max(int(data.get("limit", 100)), 1), MAX_SEARCH_HITS)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid limit, integer required"}), 400
+
+    score = match(Reply.comment, against=against).in_boolean_mode()
+    rows = (
+        db.session.query(Reply.replyId, Reply.postId, Reply.comment, score.label("score"))
+        .filter(Reply.isActive == True, score)
+        .order_by(score.desc(), Reply.replyId.desc())
+        .limit(limit)
         .all()
     )
 
-    reply_count_dict = {str(post_id): count for post_id, count in reply_counts}
+    terms = parse_terms(against)
+    hits, seen = [], set()
+    for reply_id, post_id, comment, reply_score in rows:
+        if post_id in seen:
+            continue
+        seen.add(post_id)
+        hits.append({
+            "postId": post_id,
+            "replyId": reply_id,
+            "score": float(reply_score),
+            "highlight": highlight(comment, terms)
+        })
 
-    return jsonify({"replyCounts": reply_count_dict}), 200
\ No newline at end of file
+    return jsonify({"hits": hits}), 200
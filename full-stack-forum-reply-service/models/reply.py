@@ -2,15 +2,46 @@ from models import db
 from sqlalchemy import CheckConstraint
 from datetime import datetime
 
+# Digits of the largest INT replyId, so path segments sort numerically as strings
+PATH_SEGMENT_WIDTH = 10
+
+def path_segment(reply_id):
+    return f"{reply_id:0{PATH_SEGMENT_WIDTH}d}/"
+
 class Reply(db.Model):
     replyId = db.Column(db.Integer, primary_key=True, autoincrement=True)
     userId = db.Column(db.Integer, nullable=False)
-    postId = db.Column(db.Integer, nullable=False)
+    postId = db.Column(db.Integer, nullable=False, index=True)  # the reply-count GROUP BY
     comment = db.Column(db.Text, nullable=False)
     isActive = db.Column(db.Boolean, default=True)
-    dateCreated = db.Column(db.DateTime, default=datetime.now())
+    dateCreated = db.Column(db.DateTime, default=datetime.now)
     parent_reply_id = db.Column(db.Integer, db.ForeignKey('reply.replyId'))
     parent_reply = db.relationship('Reply', remote_side=[replyId], backref='child_replies')
+    # Materialized path: a segment per replyId from the top-level reply down to this one, so a whole
+    # thread or subtree is one index range, already in depth-first order
+    path = db.Column(db.String(255))
+    depth = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    threadId = db.Column(db.Integer)  # replyId of the top-level reply
+
+    __table_args__ = (
+        # get_replies: a post's active replies in (dateCreated, replyId) keyset order, InnoDB appends the PK
+        db.Index("ix_reply_post_active_created", "postId", "isActive", "dateCreated"),
+        # POST /replies/search: MATCH(comment) AGAINST (...)
+        db.Index("ft_reply_comment", "comment", mysql_prefix="FULLTEXT"),
+        # Threaded replies: the threads of a page (threadId IN ...) and subtrees (path LIKE '...%')
+        db.Index("ix_reply_post_thread_path", "postId", "threadId", "path"),
+        # Top-level replies of a post, in keyset order
+        db.Index("ix_reply_post_depth", "postId", "depth", "replyId"),
+    )
+
+    def place_under(self, parent):
+        """Set path, depth and threadId once replyId is assigned; parent is None for a top-level reply."""
+        if parent is None:
+            self.path, self.depth, self.threadId = path_segment(self.replyId), 0, self.replyId
+        else:
+            self.path = parent.path + path_segment(self.replyId)
+            self.depth = parent.depth + 1
+            self.threadId = parent.threadId
 
     def __repr__(self):
-        return f'<Reply {self.replyId}>'
\ No newline at end of file
+        return f'<Reply {self.replyId}>'
@@ -0,0 +1,8 @@
+from .reply_counts import active_counts_query, adjust_reply_count, get_reply_counts, refresh_reply_counts
+from .summaries import newest_replies_query, reply_summaries
+from .threads import (MAX_REPLY_DEPTH, backfill_reply_paths, load_subtree, load_threads, nest, subtree_query,
+                      thread_roots_query, threads_query)
+
+__all__ = ["active_counts_query", "adjust_reply_count", "get_reply_counts", "refresh_reply_counts", "newest_replies_query",
+           "reply_summaries", "MAX_REPLY_DEPTH", "backfill_reply_paths", "load_subtree", "load_threads", "nest", "subtree_query",
+           "thread_roots_query", "threads_query"]
@@ -0,0 +1,85 @@
+import os
+import sys
+import redis
+from sqlalchemy import func
+from models import db
+from models.reply import Reply
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from shared.redis_client import get_redis
+
+# reply:count:<postId> -> number of active replies of the post
+COUNT_PREFIX = "reply:count:"
+# Bounds how long a counter that missed an update (Redis down, or a write racing its backfill) stays wrong
+REPLY_COUNT_TTL = int(os.getenv("REPLY_COUNT_TTL", "86400"))
+
+# Only adjust counters that exist: a missing one is backfilled from the database on its next read,
+# creating it here would start it from zero
+_ADJUST_IF_CACHED = """
+if redis.call("exists", KEYS[1]) == 1 then
+    return redis.call("incrby", KEYS[1], ARGV[1])
+end
+return false
+"""
+
+def active_counts_query(post_ids):
+    return (
+        db.session.query(Reply.postId, func.count(Reply.replyId))
+        .filter(Reply.postId.in_(post_ids), Reply.isActive == True)
+        .group_by(Reply.postId)
+    )
+
+def _key(post_id):
+    return f"{COUNT_PREFIX}{post_id}"
+
+def adjust_reply_count(post_id, delta):
+    """Add delta to a post's active reply counter after a committed change. Best effort."""
+    try:
+        get_redis().eval(_ADJUST_IF_CACHED, 1, _key(post_id), delta)
+    except redis.exceptions.RedisError as e:
+        print(f"❌ Could not adjust reply count of post {post_id}: {e}")
+
+def _store_counts(counts, overwrite):
+    pipe = get_redis().pipeline(transaction=False)
+    for post_id, count in counts.items():
+        pipe.set(_key(post_id), count, ex=REPLY_COUNT_TTL, nx=not overwrite)
+    pipe.execute()
+
+def _count_in_database(post_ids):
+    counts = {post_id: 0 for post_id in post_ids}
+    counts.update(active_counts_query(post_ids).all())
+    return counts
+
+def get_reply_counts(post_ids):
+    """
+    {postId: active reply count} for every post in post_ids, from one MGET of the counters. Misses
+    are counted with one GROUP BY and backfilled; everything is counted in the database if Redis is
+    unavailable. Must run inside an app context.
+    """
+    post_ids = list(dict.fromkeys(post_ids))
+    try:
+        cached = get_redis().mget([_key(post_id) for post_id in post_ids])
+    except redis.exceptions.RedisError as e:
+        print(f"❌ Reply counters unavailable, counting in the database: {e}")
+        return _count_in_database(post_ids)
+
+    counts = {post_id: int(count) for post_id, count in zip(post_ids, cached) if count is not None}
+    misses = [post_id for post_id in post_ids if post_id not in counts]
+    if misses:
+        backfill = _count_in_database(misses)
+        try:
+            # NX: a counter created meanwhile already has the newer count
+            _store_counts(backfill, overwrite=False)
+        except redis.exceptions.RedisError as e:
+            print(f"❌ Could not backfill {len(backfill)} reply counters: {e}")
+        counts.update(backfill)
+    return counts
+
+def refresh_reply_counts(post_ids):
+    """Recount active replies in the database and overwrite their counters, to repair drift. Returns the counts."""
+    counts = _count_in_database(list(dict.fromkeys(post_ids)))
+    try:
+        _store_counts(counts, overwrite=True)
+    except redis.exceptions.RedisError as e:
+        print(f"❌ Could not refresh {len(counts)} reply counters: {e}")
+    return counts
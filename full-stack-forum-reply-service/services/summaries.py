@@ -0,0 +1,36 @@
+from sqlalchemy import select, union_all
+from models import db
+from models.reply import Reply
+from services.reply_counts import get_reply_counts
+
+def newest_replies_query(post_ids, limit):
+    """
+    The `limit` newest active replies of each post as one query: a UNION ALL of one
+    ORDER BY dateCreated DESC LIMIT `limit` per post, so each post reads at most `limit` rows
+    from the (postId, isActive, dateCreated) index however many replies it has.
+    """
+    per_post = [
+        select(Reply.replyId)
+        .where(Reply.postId == post_id, Reply.isActive == True)
+        .order_by(Reply.dateCreated.desc(), Reply.replyId.desc())
+        .limit(limit)
+        .subquery()
+        for post_id in dict.fromkeys(post_ids)
+    ]
+    newest = union_all(*(select(ids.c.replyId) for ids in per_post)).subquery()
+    return (
+        Reply.query
+        .join(newest, Reply.replyId == newest.c.replyId)
+        .order_by(Reply.postId, Reply.dateCreated.desc(), Reply.replyId.desc())
+    )
+
+def reply_summaries(post_ids, limit):
+    """
+    {postId: (newest `limit` active replies, newest first; total active replies)} for every post in
+    post_ids, the totals coming from the reply counters. Must run inside an app context.
+    """
+    counts = get_reply_counts(post_ids)
+    summaries = {post_id: ([], counts.get(post_id, 0)) for post_id in post_ids}
+    for reply in newest_replies_query(post_ids, limit).all():
+        summaries[reply.postId][0].append(reply)
+    return summaries
@@ -0,0 +1,103 @@
+import os
+from models import db
+from models.reply import PATH_SEGMENT_WIDTH, Reply
+
+# Deepest reply allowed, top-level replies are depth 0; bounded by what fits in Reply.path
+MAX_REPLY_DEPTH = min(int(os.getenv("MAX_REPLY_DEPTH", "10")), 255 // (PATH_SEGMENT_WIDTH + 1) - 1)
+BACKFILL_BATCH_SIZE = 1000
+
+def thread_roots_query(post_id, after_id, limit):
+    """Ids of a post's next `limit` top-level replies after after_id, in replyId order."""
+    return (
+        db.session.query(Reply.replyId)
+        .filter(Reply.postId == post_id, Reply.depth == 0, Reply.replyId > after_id)
+        .order_by(Reply.replyId)
+        .limit(limit)
+    )
+
+def threads_query(post_id, root_ids, max_depth):
+    """Every reply of the threads rooted at root_ids, up to max_depth + 1, in path order."""
+    return (
+        Reply.query
+        .filter(Reply.postId == post_id, Reply.threadId.in_(root_ids), Reply.depth <= max_depth + 1)
+        .order_by(Reply.path)
+    )
+
+def load_threads(post_id, after_id, page_size, max_depth):
+    """
+    Replies of the next page_size threads after after_id, in path order. Returns (replies, has_more).
+    page_size + 1 root ids are fetched first, the extra one only telling whether there is another
+    page, and only the threads of the page are loaded.
+    """
+    root_ids = [row.replyId for row in thread_roots_query(post_id, after_id, page_size + 1)]
+    has_more = len(root_ids) > page_size
+    root_ids = root_ids[:page_size]
+    if not root_ids:
+        return [], has_more
+    return threads_query(post_id, root_ids, max_depth).all(), has_more
+
+def subtree_query(root, max_depth):
+    """root and its descendants down to max_depth levels below it (+1 to flag truncation), in path order."""
+    return (
+        Reply.query
+        .filter(Reply.postId == root.postId, Reply.threadId == root.threadId,
+                Reply.path.like(root.path + "%"), Reply.depth <= root.depth + max_depth + 1)
+        .order_by(Reply.path)
+    )
+
+def load_subtree(root, max_depth):
+    return subtree_query(root, max_depth).all()
+
+def nest(replies, format_node, max_depth):
+    """
+    Build trees from replies in path order in one pass, parents always come before their children.
+    format_node(reply) returns the dict a node is rendered as; each gets "children" and, when replies
+    below it were cut off by max_depth (relative to the shallowest reply), "hasMoreReplies".
+    Returns the list of root nodes.
+    """
+    if not replies:
+        return []
+    top = min(reply.depth for reply in replies)
+    nodes, roots = {}, []
+    for reply in replies:
+        parent = nodes.get(reply.parent_reply_id)
+        if reply.depth - top > max_depth:
+            if parent is not None:
+                parent["hasMoreReplies"] = True
+            continue
+        node = {**format_node(reply), "children": [], "hasMoreReplies": False}
+        nodes[reply.replyId] = node
+        if reply.depth == top or parent is None:
+            roots.append(node)
+        else:
+            parent["children"].append(node)
+    return roots
+
+def backfill_reply_paths(batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Set path, depth and threadId on replies created before threading, batch_size at a time in replyId
+    order, which places parents before their children. Returns the number of replies updated.
+    Must run inside an app context.
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        batch = (
+            Reply.query
+            .filter(Reply.path.is_(None), Reply.replyId > last_id)
+            .order_by(Reply.replyId)
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            return updated
+        last_id = batch[-1].replyId
+        for reply in batch:
+            parent = reply.parent_reply if reply.parent_reply_id else None
+            if parent is not None and parent.path is None:
+                # A parent with a higher replyId than its child cannot come from create_reply
+                print(f"❌ Reply {reply.replyId} has an unplaced parent {parent.replyId}, left unthreaded")
+                continue
+            reply.place_under(parent)
+            updated += 1
+        db.session.commit()
@@ -5,6 +5,9 @@ from dotenv import load_dotenv
 from flask_cors import CORS
 from controllers.user_blueprint import user_bp
 from controllers.admin_blueprint import admin_bp
+from services import invalidate_cached_profile
+from shared.events import USER_EVENTS, subscribe
+from shared.auth import register_endpoint_metrics
 
 # load env file
 load_dotenv()
@@ -30,12 +33,16 @@ db.init_app(app)
 
 app.register_blueprint(user_bp, url_prefix='/users')
 app.register_blueprint(admin_bp, url_prefix='/admin')
+register_endpoint_metrics(app)
 
 # Create user table
 with app.app_context():
     db.create_all()
     print("---User table created successfully!---")
 
+# Drop cached public profiles when a user changes, whichever process handled the change
+subscribe(USER_EVENTS, invalidate_cached_profile)
+
 # root path
 @app.route("/")
 def index():
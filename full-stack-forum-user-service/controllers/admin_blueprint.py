@@ -12,17 +12,18 @@ import boto3
 import os
 import re
 from validate_email_address import validate_email
-from decorator import authenticate_user
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from shared.auth import ADMIN_ROLES, SUPER_ADMIN_ROLES, authenticate_user
+from shared.events import USER_EVENTS, publish_event
 
 admin_bp = Blueprint("admin_bp", __name__)
 
 # get all user's information
 @admin_bp.route("/users", methods=["GET"])
-@authenticate_user()
+@authenticate_user(required_roles=ADMIN_ROLES)
 def get_all_users(user_id, user_verified, user_role):
-    if user_role not in ["admin", "super_admin"]:
-        return jsonify({"error": "Forbidden: Only admin can access this data"})
-
     users = User.query.all()
     user_list = [
         {
@@ -40,11 +41,8 @@ def get_all_users(user_id, user_verified, user_role):
 
 # Update user's account (active/banned)
 @admin_bp.route("/users/<int:user_id>/update-status", methods=["PUT"])
-@authenticate_user()
+@authenticate_user(required_roles=ADMIN_ROLES)
 def update_user_status(user_id, user_verified, user_role):
-    if user_role not in ["admin", "super_admin"]:
-        return jsonify({"error": "Forbidden: Only admin can access this data"})
-
     target_user = User.query.get(user_id)
     if not target_user:
         return jsonify({"error": "User not found"}), 404
@@ -55,11 +53,13 @@ def update_user_status(user_id, user_verified, user_role):
     if new_status is None:
         return jsonify({"error": "Invalid request: 'active' field is required"})
     
-    if user_role == "admin" and target_user.type in ["admin", "super_admin"]:
+    if user_role == "admin" and target_user.type in ADMIN_ROLES:
         return jsonify({"error": "Forbidden: Action forbiddened"})
     
     target_user.active = not target_user.active  # update the user's active status
     db.session.commit()
+    publish_event(USER_EVENTS, "user_status_changed", userId=target_user.userId, email=target_user.email,
+                  active=target_user.active)
 
     return jsonify({
         "message": f"User {'unbanned' if target_user.active else 'banned'} successfully",
@@ -73,11 +73,8 @@ def update_user_status(user_id, user_verified, user_role):
 
 # Super admin: promote a normal user to admin
 @admin_bp.route("/users/<int:user_id>/promote", methods=["PUT"])
-@authenticate_user()
+@authenticate_user(required_roles=SUPER_ADMIN_ROLES)
 def promote_user(user_id, user_verified, user_role):
-    if user_role != "super_admin":
-        return jsonify({"error": "Forbidden: Only super_admin can promote users"}), 403
-    
     target_user = User.query.get(user_id)
     if not target_user:
         return jsonify({"error": "User not found"}), 404
@@ -89,6 +86,8 @@ def promote_user(user_id, user_verified, user_role):
 
     target_user.type = "admin"
     db.session.commit()
+    publish_event(USER_EVENTS, "user_role_changed", userId=target_user.userId, email=target_user.email,
+                  type=target_user.type)
 
     return jsonify({
         "message": "User promoted to admin successfully",
@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
 from models import db  # Use the shared db instance
 from models.user import User
-from werkzeug.security import generate_password_hash
+from services import get_public_profiles, profile_cache
+from werkzeug.security import check_password_hash, generate_password_hash
 from werkzeug.utils import secure_filename
 from werkzeug.datastructures import MultiDict
 import json
@@ -12,8 +13,16 @@ import boto3
 import os
 import requests
 import re
+import uuid
 from validate_email_address import validate_email
-from decorator import authenticate_user
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from shared.auth import authenticate_user, current_identity
+from shared.derivatives import IMAGE_QUEUE, derivative_keys, forget_srcset, image_job, is_image, srcsets_for
+from shared.discovery import require_internal
+from shared.events import USER_EVENTS, publish_event
+from shared.passwords import PASSWORD_HASH_METHOD, needs_rehash
 
 # user_bp = Blueprint("user_bp", __name__, url_prefix='/users')
 user_bp = Blueprint("user_bp", __name__)
@@ -45,18 +54,19 @@ def connect_rabbitmq():
         rabbitmq_connection = pika.BlockingConnection(pika.ConnectionParameters('localhost'))
         channel = rabbitmq_connection.channel()
         channel.queue_declare(queue='email_queue', durable=True)  # Ensure queue exists
+        channel.queue_declare(queue=IMAGE_QUEUE, durable=True)
 
 # Ensure connection is open before sending messages
-def publish_to_rabbitmq(message):
+def publish_to_rabbitmq(message, queue='email_queue'):
     global rabbitmq_connection, channel
     try:
         connect_rabbitmq()
-        channel.basic_publish(exchange='', routing_key='email_queue', body=json.dumps(message))
-        print(f"📩 Sent verification email request: {message}")
+        channel.basic_publish(exchange='', routing_key=queue, body=json.dumps(message))
+        print(f"📩 Sent {queue} message: {message}")
     except pika.exceptions.StreamLostError as e:
         print("🔄 RabbitMQ Connection Lost. Reconnecting...")
         connect_rabbitmq()
-        channel.basic_publish(exchange='', routing_key='email_queue', body=json.dumps(message))
+        channel.basic_publish(exchange='', routing_key=queue, body=json.dumps(message))
 
 # generate 6-digit random code
 def generate_verification_code(length=6):
@@ -83,7 +93,7 @@ def register():
         return jsonify({"error": "Email already registered"}), 400
 
     try:
-        hashed_password = generate_password_hash(data["password"], method="pbkdf2:sha256")
+        hashed_password = generate_password_hash(data["password"], method=PASSWORD_HASH_METHOD)
         new_user = User(
             firstName=data["firstName"],
             lastName=data["lastName"],
@@ -115,6 +125,7 @@ def register():
         return jsonify({"error": f"Registration failed: {str(e)}"}), 500
 
 @user_bp.route("/search", methods=["GET"])
+@require_internal  # returns the hashed password, only the auth service may call it
 def search_user_by_email():
     """
     Fetch a user's details based on an email query parameter.
@@ -146,6 +157,34 @@ def search_user_by_email():
     }
     return jsonify(user_data), 200
 
+# rehash a password with the current cost, used by the auth service's rehash-on-login
+@user_bp.route("/<int:user_id>/password-hash", methods=["PUT"])
+@require_internal
+def update_password_hash(user_id):
+    """
+    Takes {"password"} of a login the auth service just verified. The hash is computed here, and only
+    after the password checks out against the stored hash, so a caller cannot set a hash of its choosing.
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get("password"), str):
+        return jsonify({"error": "Invalid request, password required"}), 400
+
+    user = User.query.get(user_id)
+    if not user:
+        return jsonify({"error": "User not found"}), 404
+    if not needs_rehash(user.password):
+        return jsonify({"message": "Password hash already current"}), 200
+
+    # Also fails if the password changed since the login was verified
+    if not check_password_hash(user.password, data["password"]):
+        return jsonify({"error": "Password does not match, rehash skipped"}), 409
+
+    user.password = generate_password_hash(data["password"], method=PASSWORD_HASH_METHOD)
+    db.session.commit()
+    publish_event(USER_EVENTS, "user_password_changed", userId=user.userId, email=user.email)
+
+    return jsonify({"message": "Password hash updated"}), 200
+
 # request email verification: send code to user's email
 @user_bp.route("/verify_email/request", methods=["POST"])
 @authenticate_user()
@@ -195,6 +234,7 @@ def verify_email(user_id, user_verified, user_role):
         if user:
             user.verified = True
             db.session.commit()
+            publish_event(USER_EVENTS, "user_verified", userId=user.userId, email=user.email)
 
             redis_client.delete(f"email_verif:{data['email']}")  # remove code from Redis after verification
             
@@ -210,6 +250,11 @@ def verify_email(user_id, user_verified, user_role):
     
 # get user profile
 DEFAULT_PROFILE_IMAGE = "https://forum-platform-file-service-bucket.s3.us-east-2.amazonaws.com/default_user.png"
+
+def profile_image_srcset(user):
+    """Resized and WebP variants of the profile image once the image worker built them, else None."""
+    return srcsets_for([user.profileImageURL]).get(user.profileImageURL) if user.profileImageURL else None
+
 @user_bp.route("/<int:user_id>/profile", methods=["GET"])
 @authenticate_user()  # email verification not required
 def get_user_profile(user_id, user_verified, user_role):
@@ -226,6 +271,7 @@ def get_user_profile(user_id, user_verified, user_role):
             "email": user.email,
             "dateJoined": user.dateJoined.strftime("%Y-%m-%d"),
             "profileImageURL": user.profileImageURL or DEFAULT_PROFILE_IMAGE,
+            "profileImageSrcset": profile_image_srcset(user),
             "type": user.type,
             "topPosts": [],
             "drafts": [],
@@ -233,6 +279,53 @@ def get_user_profile(user_id, user_verified, user_role):
         }
     }), 200
     
+# look up the public profiles of many users at once, keyed by user id
+MAX_BATCH_USERS = 500
+@user_bp.route("/batch", methods=["POST"])
+@authenticate_user()  # email verification not required
+def get_users_batch(user_id, user_verified, user_role):
+    data = request.get_json(silent=True)
+    user_ids = data.get("userIds") if data else None
+
+    if not isinstance(user_ids, list) or not user_ids:
+        return jsonify({"error": "Invalid request, non-empty 'userIds' list required"}), 400
+    if len(user_ids) > MAX_BATCH_USERS:
+        return jsonify({"error": f"Too many userIds, at most {MAX_BATCH_USERS} per request"}), 400
+
+    try:
+        user_ids = [int(requested_id) for requested_id in user_ids]
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid request, userIds must be integers"}), 400
+
+    # Users that do not exist are left out of the map
+    profiles = get_public_profiles(user_ids)
+    srcsets = srcsets_for(profile["profileImageURL"] for profile in profiles.values())
+    return jsonify({
+        "users": {
+            str(profile["id"]): {
+                **profile,
+                "profileImageURL": profile["profileImageURL"] or DEFAULT_PROFILE_IMAGE,
+                "profileImageSrcset": srcsets.get(profile["profileImageURL"]),
+            }
+            for profile in profiles.values()
+        }
+    }), 200
+
+PROFILE_IMAGE_BASE_URL = f"https://{AWS_S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/"
+
+def remove_profile_image(url, user_id):
+    """Delete a replaced profile image and its variants. Best effort, the default image is never deleted."""
+    if not url or not url.startswith(f"{PROFILE_IMAGE_BASE_URL}profile_images/user_{user_id}/"):
+        return
+    key = url[len(PROFILE_IMAGE_BASE_URL):]
+    forget_srcset(url)
+    try:
+        s3_client.delete_objects(Bucket=AWS_S3_BUCKET, Delete={
+            "Objects": [{"Key": object_key} for object_key in [key, *derivative_keys(key)]], "Quiet": True
+        })
+    except Exception as e:
+        print(f"❌ Could not delete replaced profile image {key}: {e}")
+
 # update user profile
 @user_bp.route("/<int:user_id>/profile", methods=["PUT"])
 @authenticate_user()  # email verification not required
@@ -247,7 +340,8 @@ def update_user_profile(user_id, user_verified, user_role):
         return jsonify({"error": "Invalid request, JSON data or file required"}), 400
 
     # Ensure only the owner or an admin can update profile
-    if user_id != int(request.headers.get("X-User-ID", -1)) and user_role != "admin":
+    identity = current_identity()
+    if user_id != identity.user_id and not identity.is_admin:
         return jsonify({"error": "Forbidden: You can only update your own profile"}), 403
 
     # Check if a profile image is included in the request
@@ -258,7 +352,10 @@ def update_user_profile(user_id, user_verified, user_role):
             return jsonify({"error": "No selected file"}), 400
 
         filename = secure_filename(image.filename)
-        s3_key = f"profile_images/user_{user_id}/{filename}"
+        # A new key per upload: the image and its variants are served with long cache lifetimes,
+        # so a replaced picture must never reuse the URL of the previous one
+        s3_key = f"profile_images/user_{user_id}/{uuid.uuid4().hex}-{filename}"
+        previous_image_url = user.profileImageURL
 
         try:
             # Upload image to AWS S3
@@ -270,16 +367,29 @@ def update_user_profile(user_id, user_verified, user_role):
         )
 
             # Store the S3 URL in the user profile
-            user.profileImageURL = f"https://{AWS_S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/{s3_key}"
+            user.profileImageURL = PROFILE_IMAGE_BASE_URL + s3_key
         except Exception as e:
             return jsonify({"error": f"Image upload failed: {str(e)}"}), 500
 
+        if is_image(image.content_type):
+            try:
+                publish_to_rabbitmq(image_job(AWS_S3_BUCKET, s3_key, user.profileImageURL, image.content_type), queue=IMAGE_QUEUE)
+            except pika.exceptions.AMQPError as e:
+                # The profile keeps its full size image
+                print(f"❌ Failed to queue profile image variants: {e}")
+
     # Email updates requies verification
+    previous_email = user.email
     if "email" in data and data["email"] != user.email:
         user.email = data["email"]
         user.verified = False  # user becomes unverified after email change
     
     db.session.commit()
+    # Other processes drop their copy on the event
+    profile_cache.delete(user.userId)
+    if "profileImage" in request.files:
+        remove_profile_image(previous_image_url, user_id)
+    publish_event(USER_EVENTS, "user_updated", userId=user.userId, email=user.email, previousEmail=previous_email)
 
     return jsonify({
         "message": "Profile updated successfully",
@@ -287,6 +397,7 @@ def update_user_profile(user_id, user_verified, user_role):
             "id": user.userId,
             "email": user.email,
             "profileImageURL": user.profileImageURL or DEFAULT_PROFILE_IMAGE,
+            "profileImageSrcset": profile_image_srcset(user),
             "type": user.type
         }
     }), 200
@@ -1,3 +0,0 @@
-from .auth import authenticate_user
-
-__all__ = ["authenticate_user"]
\ No newline at end of file
@@ -0,0 +1,3 @@
+from .profiles import get_public_profiles, invalidate_cached_profile, profile_cache
+
+__all__ = ["get_public_profiles", "invalidate_cached_profile", "profile_cache"]
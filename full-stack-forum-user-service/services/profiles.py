@@ -0,0 +1,45 @@
+import os
+import sys
+from models import db
+from models.user import User
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from shared.cache import TTLCache
+
+# Public profile fields by userId, for batch lookups (author names next to posts and replies).
+# Dropped on user service events; the TTL bounds staleness if an event is missed.
+profile_cache = TTLCache(
+    maxsize=int(os.getenv("PROFILE_CACHE_SIZE", "10000")),
+    ttl=int(os.getenv("PROFILE_CACHE_TTL", "300"))
+)
+
+PUBLIC_COLUMNS = (User.userId, User.firstName, User.lastName, User.dateJoined, User.profileImageURL, User.type)
+
+def invalidate_cached_profile(event):
+    """Handler for user service events, which all carry the userId of the user that changed."""
+    if event.get("userId") is not None:
+        profile_cache.delete(int(event["userId"]))
+
+def get_public_profiles(user_ids):
+    """
+    {userId: public profile fields} for the users that exist, from the LRU and then one IN query
+    over just those columns for the misses. profileImageURL is None for users without an image.
+    Must run inside an app context.
+    """
+    # Rows read before an update commits are not cached if its invalidation lands meanwhile
+    generation = profile_cache.generation()
+    profiles = profile_cache.get_many(user_ids)
+    misses = [user_id for user_id in dict.fromkeys(user_ids) if user_id not in profiles]
+    if misses:
+        for row in db.session.query(*PUBLIC_COLUMNS).filter(User.userId.in_(misses)).all():
+            profile = {
+                "id": row.userId,
+                "firstName": row.firstName,
+                "lastName": row.lastName,
+                "dateJoined": row.dateJoined.strftime("%Y-%m-%d") if row.dateJoined else None,
+                "profileImageURL": row.profileImageURL,
+                "type": row.type,
+            }
+            profile_cache.set(row.userId, profile, generation=generation)
+            profiles[row.userId] = profile
+    return profiles
@@ -3,7 +3,10 @@ from models import db
 import os
 from dotenv import load_dotenv
 from flask_cors import CORS
-from routes.history_blueprint import history_bp
+from routes.history_blueprint import history_bp, invalidate_post_summary, view_buffer
+from shared.events import POST_EVENTS, subscribe
+from shared.auth import register_endpoint_metrics
+from shared.http_client import register_upstream_metrics
 
 # load env file
 load_dotenv()
@@ -20,6 +23,8 @@ DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
+register_upstream_metrics(app)
+register_endpoint_metrics(app)
 # app.url_map.strict_slashes = False
 
 app.config["SQLALCHEMY_DATABASE_URI"] = DATABASE_URL
@@ -29,6 +34,12 @@ db.init_app(app)
 
 app.register_blueprint(history_bp, url_prefix='/history')
 
+# Start batching view writes, pending views are flushed on shutdown
+view_buffer.start(app)
+
+# Drop cached post summaries when posts are edited or change status
+subscribe(POST_EVENTS, invalidate_post_summary)
+
 # Create user table
 with app.app_context():
     db.create_all()
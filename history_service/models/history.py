@@ -5,10 +5,15 @@ class History(db.Model):
     __tablename__ = 'history'
 
     historyId = db.Column(db.Integer, primary_key=True, autoincrement=True)  # Unique history entry ID
-    userId = db.Column(db.Integer, nullable=False, index=True)  # User who viewed the post
+    userId = db.Column(db.Integer, nullable=False)  # User who viewed the post
     postId = db.Column(db.Integer, nullable=False, index=True)  # The viewed post
     viewDate = db.Column(db.DateTime, default=datetime.utcnow)  # Timestamp when viewed
 
+    __table_args__ = (
+        db.Index("ix_history_user_viewdate", "userId", "viewDate"),  # A user's history, newest first
+        db.UniqueConstraint("userId", "postId", name="uq_history_user_post"),  # One row per viewed post, upserted on view
+    )
+
     def to_dict(self):
         return {
             "historyId": self.historyId,
@@ -3,12 +3,79 @@ import requests
 from models import db   # Use the shared db instance
 from models.history import History
 from datetime import datetime
+from sqlalchemy import tuple_
 import json
-from decorator import authenticate_user
+import os
+import sys
+from services import ViewBuffer
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+from shared.auth import authenticate_user
+from shared.cache import TTLCache
+from shared.discovery import internal_headers, service_url
+from shared.exceptions import ValidationError
+from shared.http_client import http
+from shared.pagination import decode_cursor, get_page_size, paginate
 
 history_bp = Blueprint("history_bp", __name__)
 
-POST_SERVICE_URL = "http://127.0.0.1:5009/posts"
+# Coalesces repeated views and writes them in batches, started by app.py
+view_buffer = ViewBuffer(
+    flush_interval_ms=int(os.getenv("HISTORY_FLUSH_INTERVAL_MS", "500")),
+    max_entries=int(os.getenv("HISTORY_FLUSH_MAX_ENTRIES", "500")),
+    max_pending=int(os.getenv("HISTORY_MAX_PENDING", "10000")),
+    max_backoff_ms=int(os.getenv("HISTORY_FLUSH_MAX_BACKOFF_MS", "30000"))
+)
+
+POST_SERVICE_URL = f"{service_url('post')}/posts"
+POST_BATCH_SIZE = 200  # matches MAX_BATCH_POSTS in the post service
+SUMMARY_CONTENT_LENGTH = 200
+
+# Title/content summaries of published posts, shared by every user's history page.
+# Entries are dropped on post change events (see invalidate_post_summary) and expire after the TTL either way.
+post_summary_cache = TTLCache(
+    maxsize=int(os.getenv("POST_SUMMARY_CACHE_SIZE", "10000")),
+    ttl=int(os.getenv("POST_SUMMARY_CACHE_TTL", "300"))
+)
+
+def invalidate_post_summary(event):
+    """Handler for post service change events (edits, status changes, archiving)."""
+    if "postId" in event:
+        post_summary_cache.delete(int(event["postId"]))
+
+def fetch_post_summaries(post_ids):
+    """
+    Resolve post ids to {"title", "content"} summaries: cache hits first, then the post service's
+    batch endpoint for the rest, one call per POST_BATCH_SIZE ids.
+    """
+    summaries = post_summary_cache.get_many(post_ids)
+    missing = [post_id for post_id in post_ids if post_id not in summaries]
+
+    # Direct call to the post service with the viewer's identity, so its visibility rules still apply
+    headers = internal_headers()
+    for start in range(0, len(missing), POST_BATCH_SIZE):
+        try:
+            post_response = http.post(f"{POST_SERVICE_URL}/batch",
+                                      json={"postIds": missing[start:start + POST_BATCH_SIZE]},
+                                      headers=headers, retry=True)
+        except requests.exceptions.RequestException as e:
+            print(f"Failed to fetch posts for history: {e}")
+            continue
+
+        if post_response.status_code != 200:
+            continue
+
+        for post_id, body in post_response.json().get("posts", {}).items():
+            post = body.get("post", {})
+            summary = {
+                "title": post.get("title", "Untitled"),
+                "content": (post.get("content") or "")[:SUMMARY_CONTENT_LENGTH]
+            }
+            summaries[int(post_id)] = summary
+            # Only published posts look the same to every user, so only they are shared through the cache
+            if post.get("status") == "Published":
+                post_summary_cache.set(int(post_id), summary)
+    return summaries
 
 # add a new histroy (user visit the post in the frontent)
 @history_bp.route("/", methods=["POST"], strict_slashes=False)
@@ -20,47 +87,45 @@ def add_history_entry(user_id, user_verified, user_role):
         return jsonify({"error": "Invalid request, postId required"}), 400
 
     try:
-        existing_history = History.query.filter_by(userId=user_id, postId=data["postId"]).first()
-
-        if existing_history:
-            # If the entry exists, update the view time
-            existing_history.viewDate = datetime.now()
-        else:
-            # Create a new history entry
-            new_history = History(
-                userId=user_id,
-                postId=data["postId"],
-                viewDate=datetime.now()
-            )
-            db.session.add(new_history)
+        post_id = int(data["postId"])
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid request, postId must be an integer"}), 400
 
-        db.session.commit()
-        return jsonify({"message": "History entry updated successfully"}), 200
-
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"error": f"Failed to update history entry: {str(e)}"}), 500
+    # Buffered: written by the next flush as a single upsert
+    view_buffer.record(user_id, post_id, datetime.now())
+    return jsonify({"message": "History entry updated successfully"}), 200
 
 # get post history of current user
 @history_bp.route("/", methods=["GET"], strict_slashes=False)
 @authenticate_user()
 def get_user_history(user_id, user_verified, user_role):
-    history_entries = History.query.filter_by(userId=user_id).order_by(History.viewDate.desc()).all()
+    # Make the user's own recent views visible before reading
+    if view_buffer.has_pending(user_id):
+        view_buffer.flush()
 
-    if not history_entries:
-        return jsonify({"message": "No history found for this user"}), 200
-    
-    history_list = []
-    for entry in history_entries:
-        headers = {"Authorization": request.headers.get("Authorization")}
-        post_response = requests.get(f"{POST_SERVICE_URL}/{entry.postId}", headers=headers)
+    query = History.query.filter_by(userId=user_id)
+
+    # Keyset pagination on (viewDate, historyId), most recent first
+    try:
+        page_size = get_page_size(request.args)
+        cursor = request.args.get("cursor")
+        if cursor:
+            last_viewed, last_id = decode_cursor(cursor, (datetime, int))
+            query = query.filter(tuple_(History.viewDate, History.historyId) < (last_viewed, last_id))
+    except ValidationError as e:
+        return jsonify({"error": e.message}), 400
 
-        if post_response.status_code == 200:
-            post_data = post_response.json().get("post", {})
-        else:
-            post_data = {"id": entry.postId, "title": "Post not found", "content": ""}
+    query = query.order_by(History.viewDate.desc(), History.historyId.desc())
+    history_entries, next_cursor = paginate(query, page_size, lambda entry: (entry.viewDate, entry.historyId))
 
-        print("History Entry:", post_data)
+    if not history_entries and not cursor:
+        return jsonify({"message": "No history found for this user", "history": [], "nextCursor": None}), 200
+
+    summaries = fetch_post_summaries(list({entry.postId for entry in history_entries}))
+
+    history_list = []
+    for entry in history_entries:
+        post_data = summaries.get(entry.postId, {"title": "Post not found", "content": ""})
 
         history_list.append({
             "historyId": entry.historyId,
@@ -70,7 +135,7 @@ def get_user_history(user_id, user_verified, user_role):
             "viewDate": entry.viewDate.strftime("%Y-%m-%d %H:%M:%S")
         })
 
-    return jsonify({"history": history_list}), 200
+    return jsonify({"history": history_list, "nextCursor": next_cursor}), 200
 
 # clear spedific record
 @history_bp.route("/<int:history_id>", methods=["DELETE"])
@@ -85,7 +150,8 @@ def delete_history_entry(user_id, user_verified, user_role, history_id):
     if history_entry.userId != user_id:
         return jsonify({"error": "You are not authorized to delete this history entry"}), 403
 
-    db.session.delete(history_entry)
-    db.session.commit()
+    with view_buffer.discarding(user_id, history_entry.postId):
+        db.session.delete(history_entry)
+        db.session.commit()
 
     return jsonify({"message": "History entry deleted successfully"}), 200
@@ -0,0 +1,3 @@
+from .view_buffer import ViewBuffer
+
+__all__ = ["ViewBuffer"]
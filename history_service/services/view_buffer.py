@@ -0,0 +1,130 @@
+import atexit
+import signal
+import sys
+import threading
+from contextlib import contextmanager
+from sqlalchemy import func
+from sqlalchemy.dialects.mysql import insert
+from models import db
+from models.history import History
+
+def upsert_views(views):
+    """
+    Write {(userId, postId): viewDate} in one INSERT ... ON DUPLICATE KEY UPDATE,
+    keeping the later viewDate when the row already exists.
+    """
+    stmt = insert(History).values([
+        {"userId": user_id, "postId": post_id, "viewDate": view_date}
+        for (user_id, post_id), view_date in views.items()
+    ])
+    stmt = stmt.on_duplicate_key_update(viewDate=func.greatest(History.viewDate, stmt.inserted.viewDate))
+    db.session.execute(stmt)
+    db.session.commit()
+
+class ViewBuffer:
+    """
+    In-process write buffer for post views. Repeated views of the same post by the same user
+    collapse into one row, and rows are flushed in batches every `flush_interval_ms` or as soon
+    as `max_entries` distinct views are pending, whichever comes first. Whatever is pending is
+    flushed on graceful shutdown.
+    While the database is failing, flushes back off exponentially up to `max_backoff_ms`, and
+    views past `max_pending` are dropped rather than growing the buffer without bound.
+    """
+    def __init__(self, flush_interval_ms=500, max_entries=500, max_pending=10000, max_backoff_ms=30000):
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_entries = max_entries
+        self.max_pending = max(max_pending, max_entries)
+        self.max_backoff = max_backoff_ms / 1000
+        self._pending = {}  # (userId, postId) -> latest viewDate
+        self._dropped = 0  # views shed since the last report
+        self._failures = 0  # consecutive failed flushes
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._app = None
+        self._thread = None
+
+    def start(self, app):
+        self._app = app
+        self._thread = threading.Thread(target=self._run, name="history-view-buffer", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        # Plain `python app.py` dies on SIGTERM without running atexit hooks, turn it into a normal exit
+        if threading.current_thread() is threading.main_thread() and signal.getsignal(signal.SIGTERM) is signal.SIG_DFL:
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    def stop(self):
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def _merge(self, key, view_date):
+        # Caller holds _lock. Views of posts already pending always fit, new ones only under the cap.
+        if key in self._pending:
+            self._pending[key] = max(self._pending[key], view_date)
+        elif len(self._pending) < self.max_pending:
+            self._pending[key] = view_date
+        else:
+            self._dropped += 1
+
+    def record(self, user_id, post_id, view_date):
+        with self._lock:
+            self._merge((user_id, post_id), view_date)
+            full = len(self._pending) >= self.max_entries
+        if full:
+            self._wakeup.set()
+
+    @contextmanager
+    def discarding(self, user_id, post_id):
+        """
+        Drop a pending view and hold off flushes for the duration of the block, in which the caller
+        deletes the stored entry. A flush already writing the view finishes first, and none can
+        write it back after the delete.
+        """
+        with self._flush_lock:
+            with self._lock:
+                self._pending.pop((user_id, post_id), None)
+            yield
+
+    def has_pending(self, user_id):
+        with self._lock:
+            return any(pending_user == user_id for pending_user, _ in self._pending)
+
+    def flush(self):
+        """Write all pending views. On failure they go back into the buffer for the next attempt."""
+        with self._flush_lock:
+            with self._lock:
+                views, self._pending = self._pending, {}
+                dropped, self._dropped = self._dropped, 0
+            if dropped:
+                print(f"❌ History view buffer full, dropped {dropped} views")
+            if not views:
+                return
+            try:
+                with self._app.app_context():
+                    upsert_views(views)
+                self._failures = 0
+            except Exception as e:
+                self._failures += 1
+                print(f"❌ Failed to flush {len(views)} history views, will retry: {e}")
+                with self._lock:
+                    for key, view_date in views.items():
+                        self._merge(key, view_date)
+
+    def _backoff(self):
+        return min(self.flush_interval * 2 ** self._failures, self.max_backoff)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            if self._failures:
+                # A full buffer does not cut the backoff short, the database gets time to recover
+                self._stopped.wait(self._backoff())
+            else:
+                self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
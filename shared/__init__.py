@@ -1,4 +1,7 @@
-from .exceptions import UnauthorizedError, NotFoundError, ServerError, ValidationError
+from .exceptions import UnauthorizedError, NotFoundError, ServerError, ValidationError, ServiceUnavailableError
 from .error_handlers import register_error_handlers
+from .cache import TTLCache
+from .pagination import encode_cursor, decode_cursor, get_page_size, paginate
 
-__all__ = ["UnauthorizedError", "NotFoundError", "ServerError", "ValidationError", "register_error_handlers"]
+__all__ = ["UnauthorizedError", "NotFoundError", "ServerError", "ValidationError", "ServiceUnavailableError", "register_error_handlers", "TTLCache",
+           "encode_cursor", "decode_cursor", "get_page_size", "paginate"]
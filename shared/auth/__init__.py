@@ -0,0 +1,156 @@
+import threading
+import time
+from functools import wraps
+from flask import g, jsonify, request
+from werkzeug.exceptions import HTTPException
+from shared.revocation import is_token_revoked
+
+ADMIN_ROLES = frozenset({"admin", "super_admin"})
+SUPER_ADMIN_ROLES = frozenset({"super_admin"})
+
+class Identity:
+    """
+    The caller as asserted by the gateway headers, parsed once per request and kept on flask.g.
+    Immutable, so a handler cannot change who the rest of the request thinks the caller is.
+    """
+    __slots__ = ("user_id", "role", "verified", "token_id")
+
+    def __init__(self, user_id, role, verified, token_id=None):
+        object.__setattr__(self, "user_id", user_id)
+        object.__setattr__(self, "role", role)
+        object.__setattr__(self, "verified", verified)
+        object.__setattr__(self, "token_id", token_id)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Identity is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Identity is immutable")
+
+    def __repr__(self):
+        return f"Identity(user_id={self.user_id}, role={self.role!r}, verified={self.verified})"
+
+    @property
+    def is_admin(self):
+        return self.role in ADMIN_ROLES
+
+    def has_role(self, roles):
+        return self.role in roles
+
+def _parse_identity():
+    user_id = request.headers.get("X-User-ID")
+    role = request.headers.get("X-User-Role")
+    if not user_id or not role:
+        return None
+    verified = request.headers.get("X-User-Verified", "").lower() == "true"
+    # int() raises ValueError for a malformed id, reported by the decorator as a 400
+    return Identity(int(user_id), role, verified, request.headers.get("X-Token-ID"))
+
+def current_identity():
+    """The caller of the current request, or None without identity headers. Parsed on first use."""
+    if "identity" not in g:
+        g.identity = _parse_identity()
+    return g.identity
+
+class EndpointStats:
+    """
+    Per-endpoint call, error and latency counters for handlers wrapped by authenticate_user.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, endpoint, elapsed, status):
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            entry = self._stats.get(endpoint)
+            if entry is None:
+                entry = self._stats[endpoint] = {"requests": 0, "errors": 0, "totalLatencyMs": 0.0, "maxLatencyMs": 0.0}
+            entry["requests"] += 1
+            entry["errors"] += 1 if status >= 400 else 0
+            entry["totalLatencyMs"] += elapsed_ms
+            entry["maxLatencyMs"] = max(entry["maxLatencyMs"], elapsed_ms)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                endpoint: {
+                    **entry,
+                    "avgLatencyMs": round(entry["totalLatencyMs"] / entry["requests"], 2) if entry["requests"] else 0.0
+                }
+                for endpoint, entry in self._stats.items()
+            }
+
+endpoint_stats = EndpointStats()
+_timing_hooks = [endpoint_stats.record]
+
+def add_timing_hook(hook):
+    """Call hook(endpoint, elapsed_seconds, status) after every request to an authenticate_user endpoint."""
+    _timing_hooks.append(hook)
+
+def _status_of(response):
+    if isinstance(response, tuple):
+        return response[1] if len(response) > 1 and isinstance(response[1], int) else 200
+    return getattr(response, "status_code", 200)
+
+def authenticate_user(required_roles=None, require_verified=False):
+    """
+    Authenticate requests by the identity headers injected by the API gateway and enforce access control.
+    The identity is available as flask.g.identity and is also passed to the handler as the user_id,
+    user_role and user_verified keyword arguments. A user_id already taken by a route parameter is left alone.
+    """
+    # Compiled once here instead of on every request
+    allowed_roles = frozenset(required_roles) if required_roles else None
+
+    def decorator(f):
+        endpoint = f"{f.__module__.rsplit('.', 1)[-1]}.{f.__name__}"
+
+        def check(args, kwargs):
+            try:
+                identity = current_identity()
+            except ValueError:
+                return jsonify({"error": "Invalid user ID format"}), 400
+            if identity is None:
+                return jsonify({"error": "Unauthorized: Missing authentication headers"}), 401
+
+            # Tokens revoked on logout, answered from the local revocation mirror
+            if is_token_revoked(identity.token_id):
+                return jsonify({"error": "Unauthorized: Token has been revoked"}), 401
+            if allowed_roles is not None and identity.role not in allowed_roles:
+                return jsonify({"error": "Forbidden: You do not have permission to access this resource"}), 403
+            if require_verified and not identity.verified:
+                return jsonify({"error": "Forbidden: Email verification required"}), 403
+
+            kwargs.setdefault("user_id", identity.user_id)
+            return f(*args, user_role=identity.role, user_verified=identity.verified, **kwargs)
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            status = 500
+            try:
+                response = check(args, kwargs)
+                status = _status_of(response)
+                return response
+            except HTTPException as e:
+                status = e.code or 500
+                raise
+            except Exception as e:
+                # CustomException subclasses from shared.exceptions carry their own status
+                status = getattr(e, "status_code", 500)
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                for hook in _timing_hooks:
+                    try:
+                        hook(endpoint, elapsed, status)
+                    except Exception as e:
+                        print(f"❌ Timing hook failed for {endpoint}: {e}")
+        return wrapper
+    return decorator
+
+def register_endpoint_metrics(app, stats=endpoint_stats):
+    """Expose the per-endpoint counters of authenticate_user handlers at GET /metrics/endpoints."""
+    @app.route("/metrics/endpoints", methods=["GET"])
+    def endpoint_metrics():
+        return jsonify({"endpoints": stats.snapshot()}), 200
@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+class TTLCache:
+    """
+    Thread-safe, size-bounded LRU cache whose entries expire `ttl` seconds after they are set.
+
+    To fill from a slower source without racing invalidation, read `generation()` before the source
+    and pass it to `set`: the value is dropped if the key was deleted in between, since it may
+    predate the change that deleted it.
+    """
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value), least recently used first
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._deleted = OrderedDict()  # key -> generation of its last delete, oldest first, at most maxsize
+        self._deleted_floor = 0  # generation of the newest delete no longer tracked per key
+
+    def _lookup(self, key, now):
+        item = self._data.get(key, _MISSING)
+        if item is _MISSING:
+            return _MISSING
+        expires_at, value = item
+        if expires_at <= now:
+            del self._data[key]
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._lookup(key, time.monotonic())
+        return default if value is _MISSING else value
+
+    def get_many(self, keys):
+        """Return a dict of the keys that are cached and not expired."""
+        now = time.monotonic()
+        hits = {}
+        with self._lock:
+            for key in keys:
+                value = self._lookup(key, now)
+                if value is not _MISSING:
+                    hits[key] = value
+        return hits
+
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def set(self, key, value, ttl=None, generation=None):
+        """Cache value, unless generation is given and key was deleted since. Returns whether it was cached."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            # A key whose delete is no longer tracked may have been deleted at any generation up to the floor
+            if generation is not None and self._deleted.get(key, self._deleted_floor) > generation:
+                return False
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._generation += 1
+            self._deleted[key] = self._generation
+            self._deleted.move_to_end(key)
+            while len(self._deleted) > self.maxsize:
+                _, self._deleted_floor = self._deleted.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generation += 1
+            self._deleted.clear()
+            self._deleted_floor = self._generation
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,76 @@
+import json
+import os
+import posixpath
+import redis
+from shared.redis_client import get_redis
+
+# RabbitMQ queue of {"bucket", "key", "url", "contentType"} jobs, consumed by the file service image worker
+IMAGE_QUEUE = "image_derivatives"
+IMAGE_CONTENT_TYPES = frozenset({"image/jpeg", "image/png", "image/webp", "image/gif", "image/bmp", "image/tiff"})
+# Widths in pixels of the resized variants, never wider than the source
+DERIVATIVE_WIDTHS = tuple(sorted({int(width) for width in os.getenv("DERIVATIVE_WIDTHS", "320,640,1280").split(",")}))
+DERIVATIVE_EXTENSIONS = ("webp", "jpg", "png")
+
+# image:srcset:<source url> -> {"webp": srcset, "default": srcset}, written once the variants are stored
+SRCSET_PREFIX = "image:srcset:"
+
+def is_image(content_type):
+    return (content_type or "").split(";")[0].strip().lower() in IMAGE_CONTENT_TYPES
+
+def image_job(bucket, key, url, content_type):
+    return {"bucket": bucket, "key": key, "url": url, "contentType": content_type}
+
+def derivative_key(source_key, width, extension):
+    """Object key of a variant, stored in the source's bucket. width None is the source's own width."""
+    name = f"{width}w" if width else "full"
+    return f"derivatives/{posixpath.splitext(source_key)[0]}/{name}.{extension}"
+
+def derivative_keys(source_key):
+    """Every key a variant of source_key may be stored under, for cleanup."""
+    return [derivative_key(source_key, width, extension)
+            for width in DERIVATIVE_WIDTHS + (None,) for extension in DERIVATIVE_EXTENSIONS]
+
+def derivative_url(source_url, source_key, key):
+    """URL of a variant, from the URL its source is served at (which ends in the source key)."""
+    return source_url[:len(source_url) - len(source_key)] + key
+
+def srcset(candidates):
+    """srcset attribute value from [(url, width)]."""
+    return ", ".join(f"{url} {width}w" for url, width in candidates)
+
+def record_srcsets(srcsets):
+    """Publish the variants of many images at once, {source url: {"webp": ..., "default": ...}}."""
+    pipe = get_redis().pipeline(transaction=False)
+    for url, variants in srcsets.items():
+        pipe.set(SRCSET_PREFIX + url, json.dumps(variants))
+    pipe.execute()
+
+def forget_srcset(url):
+    """
+    Stop serving the variants of an image, e.g. when its object is replaced or deleted.
+    Returns the variants that were recorded, or None.
+    """
+    try:
+        pipe = get_redis().pipeline()
+        pipe.get(SRCSET_PREFIX + url)
+        pipe.delete(SRCSET_PREFIX + url)
+        recorded, _ = pipe.execute()
+        return json.loads(recorded) if recorded else None
+    except redis.exceptions.RedisError as e:
+        print(f"❌ Could not forget the variants of {url}: {e}")
+        return None
+
+def srcsets_for(urls):
+    """
+    {url: {"webp": srcset, "default": srcset}} for the images among urls whose variants are ready, in one
+    round trip. Images still being processed, or everything while Redis is down, are simply left out.
+    """
+    urls = list(dict.fromkeys(url for url in urls if url))
+    if not urls:
+        return {}
+    try:
+        recorded = get_redis().mget([SRCSET_PREFIX + url for url in urls])
+    except redis.exceptions.RedisError as e:
+        print(f"❌ Image variants unavailable: {e}")
+        return {}
+    return {url: json.loads(variants) for url, variants in zip(urls, recorded) if variants}
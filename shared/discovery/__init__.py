@@ -0,0 +1,91 @@
+import hmac
+import json
+import os
+import threading
+from functools import wraps
+from flask import has_request_context, jsonify, request
+
+# Same ports as the gateway's service table, used when neither env nor the registry file knows a service
+DEFAULT_SERVICE_URLS = {
+    "user": "http://127.0.0.1:5001",
+    "post": "http://127.0.0.1:5002",
+    "reply": "http://127.0.0.1:5003",
+    "history": "http://127.0.0.1:5004",
+    "message": "http://127.0.0.1:5005",
+    "auth": "http://127.0.0.1:5006",
+    "email": "http://127.0.0.1:5007",
+    "file": "http://127.0.0.1:5008",
+}
+
+INTERNAL_TOKEN_HEADER = "X-Internal-Token"
+IDENTITY_HEADERS = ("X-User-ID", "X-User-Role", "X-User-Verified", "X-Token-ID")
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def _load_registry():
+    """Read the optional JSON registry file ({"post": "http://10.0.0.12:5002", ...}) once per process."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                path = os.getenv("SERVICE_REGISTRY_FILE")
+                registry = {}
+                if path:
+                    try:
+                        with open(path) as f:
+                            registry = json.load(f)
+                    except (OSError, ValueError) as e:
+                        print(f"❌ Could not read service registry {path}: {e}")
+                _registry = registry
+    return _registry
+
+def service_url(name):
+    """
+    Base URL of an internal service, without trailing slash. Looked up in <NAME>_SERVICE_URL,
+    then the SERVICE_REGISTRY_FILE registry, then the local development defaults.
+    """
+    url = os.getenv(f"{name.upper()}_SERVICE_URL") or _load_registry().get(name) or DEFAULT_SERVICE_URLS.get(name)
+    if not url:
+        raise KeyError(f"Unknown service: {name}")
+    return url.rstrip("/")
+
+def _internal_token():
+    return os.getenv("INTERNAL_SERVICE_TOKEN", "")
+
+def internal_headers(forward_identity=True):
+    """
+    Headers for a direct service-to-service call: the shared internal token, plus the caller's
+    identity headers (normally injected by the gateway) when made while handling a request.
+    """
+    headers = {}
+    token = _internal_token()
+    if token:
+        headers[INTERNAL_TOKEN_HEADER] = token
+    if forward_identity and has_request_context():
+        for name in IDENTITY_HEADERS:
+            value = request.headers.get(name)
+            if value is not None:
+                headers[name] = value
+    return headers
+
+def is_internal_request():
+    """
+    True if the request carries the internal token. Without INTERNAL_SERVICE_TOKEN configured nothing is
+    internal: the gateway forwards client requests from loopback, so the source address proves nothing.
+    """
+    token = _internal_token()
+    if not token:
+        return False
+    return hmac.compare_digest(request.headers.get(INTERNAL_TOKEN_HEADER, ""), token)
+
+def require_internal(f):
+    """Restrict an endpoint to other services, i.e. requests carrying INTERNAL_SERVICE_TOKEN."""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        if not is_internal_request():
+            if not _internal_token():
+                print(f"❌ INTERNAL_SERVICE_TOKEN is not set, refusing internal endpoint {request.path}")
+            return jsonify({"error": "Forbidden: internal endpoint"}), 403
+        return f(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,45 @@
+import json
+import threading
+import time
+import redis
+from shared.redis_client import get_redis
+
+# Channels
+POST_EVENTS = "post_events"
+REPLY_EVENTS = "reply_events"
+USER_EVENTS = "user_events"
+
+def publish_event(channel, event_type, **data):
+    """
+    Publish a change event. Delivery is best effort: a Redis outage is logged, never raised to the caller.
+    """
+    try:
+        get_redis().publish(channel, json.dumps({"type": event_type, **data}))
+    except redis.exceptions.RedisError as e:
+        print(f"❌ Failed to publish {event_type} on {channel}: {e}")
+
+def subscribe(channel, handler, retry_delay=1.0, max_retry_delay=30.0):
+    """
+    Call handler(event) for every event published on channel, from a daemon thread that reconnects on errors.
+    Events published while disconnected are lost, so caches fed by this must still expire on their own.
+    """
+    def listen():
+        delay = retry_delay
+        while True:
+            try:
+                pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(channel)
+                delay = retry_delay
+                for message in pubsub.listen():
+                    try:
+                        handler(json.loads(message["data"]))
+                    except Exception as e:
+                        print(f"❌ Event handler failed on {channel}: {e}")
+            except redis.exceptions.RedisError as e:
+                print(f"🔄 Lost subscription to {channel} ({e}), retrying in {delay:.0f}s")
+                time.sleep(delay)
+                delay = min(delay * 2, max_retry_delay)
+
+    thread = threading.Thread(target=listen, name=f"subscribe-{channel}", daemon=True)
+    thread.start()
+    return thread
@@ -25,4 +25,8 @@ class NotFoundError(CustomException):
 
 class ValidationError(CustomException):
     def __init__(self, message="Validation error", status_code=400, payload=None):
-        super().__init__(message, status_code, payload)
\ No newline at end of file
+        super().__init__(message, status_code, payload)
+
+class ServiceUnavailableError(CustomException):
+    def __init__(self, message="Service temporarily unavailable", status_code=503, payload=None):
+        super().__init__(message, status_code, payload)
@@ -0,0 +1,124 @@
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from flask import jsonify
+from requests.adapters import HTTPAdapter
+
+CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+BACKOFF_FACTOR = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.2"))
+POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "10"))
+POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({502, 503, 504})
+
+class UpstreamStats:
+    """
+    Per-upstream request, error, retry and latency counters.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _entry(self, upstream):
+        return self._stats.setdefault(upstream, {
+            "requests": 0,
+            "errors": 0,
+            "retries": 0,
+            "totalLatencyMs": 0.0,
+            "maxLatencyMs": 0.0
+        })
+
+    def record(self, upstream, latency, error):
+        latency_ms = latency * 1000
+        with self._lock:
+            entry = self._entry(upstream)
+            entry["requests"] += 1
+            entry["errors"] += 1 if error else 0
+            entry["totalLatencyMs"] += latency_ms
+            entry["maxLatencyMs"] = max(entry["maxLatencyMs"], latency_ms)
+
+    def record_retry(self, upstream):
+        with self._lock:
+            self._entry(upstream)["retries"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                upstream: {
+                    **entry,
+                    "avgLatencyMs": round(entry["totalLatencyMs"] / entry["requests"], 2) if entry["requests"] else 0.0
+                }
+                for upstream, entry in self._stats.items()
+            }
+
+class HttpClient:
+    """
+    requests.Session wrapper for inter-service calls: keep-alive connection pools per host, default
+    timeouts, and retries with exponential backoff on connection errors and 502/503/504.
+    Only idempotent methods are retried unless the call passes retry=True (e.g. read-only POST lookups).
+    """
+    def __init__(self, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), retries=RETRIES, backoff_factor=BACKOFF_FACTOR,
+                 pool_connections=POOL_HOSTS, pool_maxsize=POOL_MAXSIZE, stats=None):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.stats = stats or UpstreamStats()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _backoff(self, attempt):
+        delay = self.backoff_factor * (2 ** attempt)
+        time.sleep(delay + random.uniform(0, delay))
+
+    def request(self, method, url, timeout=None, retries=None, retry=None, upstream=None, **kwargs):
+        upstream = upstream or urlsplit(url).netloc
+        retries = self.retries if retries is None else retries
+        can_retry = method.upper() in IDEMPOTENT_METHODS if retry is None else retry
+        timeout = timeout or self.timeout
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self.stats.record(upstream, time.perf_counter() - start, error=True)
+                if not can_retry or attempt >= retries:
+                    raise
+            else:
+                self.stats.record(upstream, time.perf_counter() - start, error=response.status_code >= 500)
+                if response.status_code not in RETRY_STATUSES or not can_retry or attempt >= retries:
+                    return response
+
+            self.stats.record_retry(upstream)
+            self._backoff(attempt)
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request("DELETE", url, **kwargs)
+
+# Process-wide client, so every caller in a service shares the same connection pools and counters
+http = HttpClient()
+
+def register_upstream_metrics(app, client=http):
+    """Expose the client's per-upstream counters at GET /metrics/upstreams."""
+    @app.route("/metrics/upstreams", methods=["GET"])
+    def upstream_metrics():
+        return jsonify({"upstreams": client.stats.snapshot()}), 200
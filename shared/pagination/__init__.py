@@ -0,0 +1,60 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from shared.exceptions import ValidationError
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+def _to_json(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _from_json(value, value_type):
+    if value_type is datetime:
+        return datetime.fromisoformat(value)
+    return value_type(value)
+
+def encode_cursor(*values):
+    """
+    Pack the sort key of the last row on a page into an opaque, URL-safe token.
+    """
+    raw = json.dumps([_to_json(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor, value_types):
+    """
+    Unpack a token produced by encode_cursor, converting each value to the matching type.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != len(value_types):
+            raise ValueError("cursor has the wrong shape")
+        return tuple(_from_json(value, value_type) for value, value_type in zip(values, value_types))
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        raise ValidationError("Invalid cursor")
+
+def get_page_size(args, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """
+    Read the `limit` query parameter, clamped to [1, maximum].
+    """
+    limit = args.get("limit")
+    if limit is None or limit == "":
+        return default
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValidationError("Invalid limit, integer required")
+    return max(1, min(limit, maximum))
+
+def paginate(query, page_size, cursor_of):
+    """
+    Fetch one page from an already ordered and keyset-filtered query.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    rows = query.limit(page_size + 1).all()
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, encode_cursor(*cursor_of(rows[-1]))
@@ -0,0 +1,9 @@
+import os
+
+# Werkzeug hash method used for new hashes, e.g. "pbkdf2:sha256:600000" or "scrypt:32768:8:1".
+# Raising the cost here makes logins transparently rehash older passwords.
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256:600000")
+
+def needs_rehash(pwhash, method=PASSWORD_HASH_METHOD):
+    """True if a stored werkzeug hash ("method$salt$hash") was made with a different method or cost."""
+    return pwhash.split("$", 1)[0] != method
@@ -0,0 +1,23 @@
+import os
+import threading
+import redis
+
+_client = None
+_lock = threading.Lock()
+
+def get_redis():
+    """
+    Process-wide Redis client. redis-py pools connections internally, so one client is shared by all threads.
+    REDIS_HOST, REDIS_PORT and REDIS_DB are read on first use, after the service has loaded its .env.
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = redis.StrictRedis(
+                    host=os.getenv("REDIS_HOST", "localhost"),
+                    port=int(os.getenv("REDIS_PORT", "6379")),
+                    db=int(os.getenv("REDIS_DB", "0")),
+                    decode_responses=True
+                )
+    return _client
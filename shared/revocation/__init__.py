@@ -0,0 +1,140 @@
+import hashlib
+import math
+import os
+import threading
+import time
+import redis
+from shared.redis_client import get_redis
+
+REVOKED_KEY_PREFIX = "revoked:"
+# Sorted set of "jti|exp" members scored by revocation time (ms), read incrementally by the mirrors
+REVOCATION_LOG_KEY = "revocation_log"
+
+REVOCATION_REFRESH_INTERVAL = float(os.getenv("REVOCATION_REFRESH_INTERVAL", "2"))  # seconds
+REVOCATION_REBUILD_INTERVAL = float(os.getenv("REVOCATION_REBUILD_INTERVAL", "3600"))  # seconds
+REVOCATION_CAPACITY = int(os.getenv("REVOCATION_CAPACITY", "100000"))
+REVOCATION_ERROR_RATE = float(os.getenv("REVOCATION_ERROR_RATE", "0.001"))
+# Re-read this much of the log on each refresh (ms), covering clock skew between the services that revoke
+REVOCATION_LOG_OVERLAP_MS = 5000
+# Longest lifetime a token can have, log entries older than this can no longer match a live token
+REVOCATION_MAX_TTL = int(os.getenv("REVOCATION_MAX_TTL", "86400"))
+
+class BloomFilter:
+    """
+    Fixed-size bloom filter over strings, sized for `capacity` items at `error_rate` false positives.
+    Not thread-safe on its own, RevocationMirror swaps whole filters instead of sharing one across rebuilds.
+    """
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class RevocationMirror:
+    """
+    Local bloom-filter copy of the revocation list. A daemon thread pulls new entries from the
+    revocation log every `refresh_interval` seconds and rebuilds the filter from scratch every
+    `rebuild_interval` seconds so expired tokens drop out. A miss is answered locally; only a
+    filter hit is confirmed against Redis, which also weeds out false positives.
+    A token revoked elsewhere may still pass for up to `refresh_interval` seconds.
+    """
+    def __init__(self, refresh_interval=REVOCATION_REFRESH_INTERVAL, rebuild_interval=REVOCATION_REBUILD_INTERVAL,
+                 capacity=REVOCATION_CAPACITY, error_rate=REVOCATION_ERROR_RATE):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filter = BloomFilter(capacity, error_rate)
+        self._cursor = 0  # revocation time (ms) of the newest entry seen
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="revocation-mirror", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except redis.exceptions.RedisError as e:
+                print(f"🔄 Revocation mirror refresh failed ({e}), retrying in {self.refresh_interval:.0f}s")
+            time.sleep(self.refresh_interval)
+
+    def refresh(self):
+        rebuild = time.monotonic() - self._built_at >= self.rebuild_interval
+        since = 0 if rebuild else max(0, self._cursor - REVOCATION_LOG_OVERLAP_MS)
+        entries = get_redis().zrangebyscore(REVOCATION_LOG_KEY, since, "+inf", withscores=True)
+
+        now = time.time()
+        target = BloomFilter(self.capacity, self.error_rate) if rebuild else self._filter
+        cursor = self._cursor if not rebuild else 0
+        for member, score in entries:
+            jti, _, exp = member.rpartition("|")
+            cursor = max(cursor, int(score))
+            if exp.isdigit() and int(exp) > now:
+                target.add(jti)
+
+        # Incremental adds only ever set bits, so readers never see a filter missing a revocation it had
+        self._filter, self._cursor = target, cursor
+        if rebuild:
+            self._built_at = time.monotonic()
+            if target.count > self.capacity:
+                print(f"⚠️ {target.count} live revocations exceed REVOCATION_CAPACITY={self.capacity}, raise it")
+
+    def add(self, jti):
+        """Record a revocation made by this process without waiting for the next refresh."""
+        self._filter.add(jti)
+
+    def is_revoked(self, jti):
+        if not jti:
+            return False
+        self.start()
+        if jti not in self._filter:
+            return False
+        try:
+            return bool(get_redis().exists(f"{REVOKED_KEY_PREFIX}{jti}"))
+        except redis.exceptions.RedisError as e:
+            # A filter hit we cannot confirm is most likely a real revocation, so fail closed
+            print(f"❌ Could not confirm revocation of {jti}: {e}")
+            return True
+
+revocations = RevocationMirror()
+
+def revoke_token(jti, exp):
+    """
+    Revoke a token by its jti until it expires anyway at `exp` (epoch seconds).
+    Raises redis errors to the caller, a logout that was not recorded must not report success.
+    """
+    ttl = int(math.ceil(exp - time.time()))
+    if ttl <= 0:
+        return False
+    now_ms = int(time.time() * 1000)
+    pipe = get_redis().pipeline()
+    pipe.set(f"{REVOKED_KEY_PREFIX}{jti}", 1, ex=ttl)
+    pipe.zadd(REVOCATION_LOG_KEY, {f"{jti}|{int(exp)}": now_ms})
+    pipe.zremrangebyscore(REVOCATION_LOG_KEY, "-inf", now_ms - REVOCATION_MAX_TTL * 1000)
+    pipe.execute()
+    revocations.add(jti)
+    return True
+
+def is_token_revoked(jti):
+    """Whether the token with this jti was revoked. Served from the local mirror unless the filter matches."""
+    return revocations.is_revoked(jti)
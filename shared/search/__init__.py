@@ -0,0 +1,50 @@
+import re
+from markupsafe import escape
+
+# InnoDB FULLTEXT ignores shorter tokens (innodb_ft_min_token_size), requiring one would match nothing
+MIN_TERM_LENGTH = 3
+MAX_TERMS = 10
+# InnoDB's default FULLTEXT stopwords, never indexed and so never matchable as required terms
+STOPWORDS = frozenset({
+    "a", "about", "an", "are", "as", "at", "be", "by", "com", "de", "en", "for", "from", "how", "i", "in",
+    "is", "it", "la", "of", "on", "or", "that", "the", "this", "to", "was", "what", "when", "where", "who",
+    "will", "with", "und", "www"
+})
+SNIPPET_LENGTH = 160
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+def parse_terms(query_text):
+    """Split a user query into distinct lowercase search terms, dropping boolean-mode operators."""
+    terms = []
+    for term in _TERM_RE.findall(query_text.lower()):
+        if len(term) >= MIN_TERM_LENGTH and term not in STOPWORDS and term not in terms:
+            terms.append(term)
+    return terms[:MAX_TERMS]
+
+def boolean_query(terms):
+    """MATCH ... AGAINST string for IN BOOLEAN MODE: every term required, each as a prefix."""
+    return " ".join(f"+{term}*" for term in terms)
+
+def highlight(text, terms, length=SNIPPET_LENGTH):
+    """
+    HTML-escaped excerpt of `text` around the first matching term, with term prefixes wrapped in <mark>.
+    Returns the start of the text when nothing matches (e.g. the hit came from a stemmed or reply match).
+    """
+    if not text:
+        return ""
+    pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE) if terms else None
+    first = pattern.search(text) if pattern else None
+
+    start = max(0, first.start() - length // 4) if first else 0
+    end = min(len(text), start + length)
+    excerpt = text[start:end]
+
+    parts, position = [], 0
+    for found in (pattern.finditer(excerpt) if pattern else ()):
+        parts.append(str(escape(excerpt[position:found.start()])))
+        parts.append(f"<mark>{escape(found.group())}</mark>")
+        position = found.end()
+    parts.append(str(escape(excerpt[position:])))
+
+    return ("…" if start > 0 else "") + "".join(parts) + ("…" if end < len(text) else "")